@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002_preset_min_tier"
+down_revision = "0001_initial"
+branch_labels = None
+depends_on = None
+
+LICENSE_TIER = sa.Enum("basic", "premium", "ultimate", name="licensetier")
+
+
+def _columns(table: str) -> set[str]:
+    return {column["name"] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade() -> None:
+    if "min_tier" not in _columns("preset"):
+        op.add_column("preset", sa.Column("min_tier", LICENSE_TIER, nullable=False, server_default="basic"))
+        with op.batch_alter_table("preset") as batch:
+            batch.alter_column("min_tier", existing_type=LICENSE_TIER, server_default=None)
+    # Backfill every row, including ones written before the tier was derived in the model.
+    preset = sa.table("preset", sa.column("audio_replace"), sa.column("hot_swap"), sa.column("min_tier", LICENSE_TIER))
+    op.execute(
+        preset.update().values(
+            min_tier=sa.case(
+                (preset.c.hot_swap == "immediate", sa.cast("ultimate", LICENSE_TIER)),
+                (
+                    sa.or_(
+                        preset.c.audio_replace.in_(["external_loop", "video_only"]),
+                        preset.c.hot_swap == "next_loop",
+                    ),
+                    sa.cast("premium", LICENSE_TIER),
+                ),
+                else_=sa.cast("basic", LICENSE_TIER),
+            )
+        )
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("preset") as batch:
+        batch.drop_column("min_tier")
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_utc_server_timestamps"
+down_revision = "0002_preset_min_tier"
+branch_labels = None
+depends_on = None
+
+TIMESTAMP_COLUMNS = (
+    ("asset", "created_at"),
+    ("destination", "created_at"),
+    ("preset", "created_at"),
+    ("job", "created_at"),
+    ("job", "updated_at"),
+    ("schedule", "created_at"),
+    ("session", "started_at"),
+    ("eventlog", "created_at"),
+    ("licensestate", "last_checked_at"),
+    ("runnerlock", "locked_at"),
+)
+
+UTC_NOW = {
+    "postgresql": "timezone('utc', now())",
+    "sqlite": "(strftime('%Y-%m-%d %H:%M:%f', 'now'))",
+}
+
+
+def _set_defaults(default: str | None) -> None:
+    for table, column in TIMESTAMP_COLUMNS:
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column(
+                column,
+                existing_type=sa.DateTime(),
+                existing_nullable=False,
+                server_default=sa.text(default) if default else None,
+            )
+
+
+def upgrade() -> None:
+    _set_defaults(UTC_NOW.get(op.get_bind().dialect.name, "CURRENT_TIMESTAMP"))
+
+
+def downgrade() -> None:
+    _set_defaults(None)
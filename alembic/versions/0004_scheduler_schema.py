@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_scheduler_schema"
+down_revision = "0003_utc_server_timestamps"
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("ix_job_asset_id", "job", ["asset_id"]),
+    ("ix_job_destination_id", "job", ["destination_id"]),
+    ("ix_job_preset_id", "job", ["preset_id"]),
+    ("ix_job_status", "job", ["status"]),
+    ("ix_schedule_job_id", "schedule", ["job_id"]),
+    ("ix_schedule_window", "schedule", ["starts_at", "ends_at"]),
+    ("ix_session_job_id", "session", ["job_id"]),
+    ("ix_session_job_id_desc", "session", ["job_id", "id"]),
+    ("ix_eventlog_session_id", "eventlog", ["session_id"]),
+    ("ix_eventlog_job_id", "eventlog", ["job_id"]),
+    ("ix_eventlog_schedule_id", "eventlog", ["schedule_id"]),
+)
+
+PLANNED_END = {
+    "postgresql": "starts_at + make_interval(mins => COALESCE(duration_minutes, 0))",
+    "sqlite": "strftime('%Y-%m-%d %H:%M:%f', starts_at, '+' || COALESCE(duration_minutes, 0) || ' minutes')",
+}
+
+
+def _inspector() -> sa.engine.Inspector:
+    return sa.inspect(op.get_bind())
+
+
+def _columns(table: str) -> set[str]:
+    return {column["name"] for column in _inspector().get_columns(table)}
+
+
+def _indexes(table: str) -> dict[str, dict]:
+    return {index["name"]: index for index in _inspector().get_indexes(table)}
+
+
+def upgrade() -> None:
+    if not _inspector().has_table("dashboardcounters"):
+        op.create_table(
+            "dashboardcounters",
+            sa.Column("id", sa.Integer(), nullable=False),
+            *(
+                sa.Column(name, sa.Integer(), nullable=False, server_default="0")
+                for name in ("streams", "assets", "destinations", "presets", "active_sessions", "invalid_jobs")
+            ),
+            sa.PrimaryKeyConstraint("id"),
+        )
+
+    for name, table, columns in INDEXES:
+        if name not in _indexes(table):
+            op.create_index(name, table, columns)
+
+    # lock_name becomes the upsert conflict target; keep the newest row per name.
+    lock_index = _indexes("runnerlock").get("ix_runnerlock_lock_name")
+    if lock_index is None or not lock_index["unique"]:
+        op.execute(
+            "DELETE FROM runnerlock WHERE id NOT IN (SELECT MAX(id) FROM runnerlock GROUP BY lock_name)"
+        )
+        if lock_index is not None:
+            op.drop_index("ix_runnerlock_lock_name", table_name="runnerlock")
+        op.create_index("ix_runnerlock_lock_name", "runnerlock", ["lock_name"], unique=True)
+
+    if "planned_end_at" not in _columns("schedule"):
+        op.add_column("schedule", sa.Column("planned_end_at", sa.DateTime(), nullable=True))
+        expression = PLANNED_END.get(op.get_bind().dialect.name)
+        if expression:
+            op.execute(f"UPDATE schedule SET planned_end_at = {expression}")
+
+    if "planned_start" not in _columns("session"):
+        op.add_column("session", sa.Column("planned_start", sa.DateTime(), nullable=True))
+    constraints = {constraint["name"] for constraint in _inspector().get_unique_constraints("session")}
+    if "uq_session_schedule_planned_start" not in constraints:
+        # Keep the earliest session per slot as the idempotency key holder; later
+        # duplicates stay as history without a slot.
+        op.execute(
+            "UPDATE session SET planned_start = NULL WHERE planned_start IS NOT NULL AND id NOT IN ("
+            "SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM session "
+            "WHERE planned_start IS NOT NULL GROUP BY schedule_id, planned_start) AS keepers)"
+        )
+        with op.batch_alter_table("session") as batch:
+            batch.create_unique_constraint("uq_session_schedule_planned_start", ["schedule_id", "planned_start"])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("session") as batch:
+        batch.drop_constraint("uq_session_schedule_planned_start", type_="unique")
+        batch.drop_column("planned_start")
+    with op.batch_alter_table("schedule") as batch:
+        batch.drop_column("planned_end_at")
+    op.drop_index("ix_runnerlock_lock_name", table_name="runnerlock")
+    op.create_index("ix_runnerlock_lock_name", "runnerlock", ["lock_name"])
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+    op.drop_table("dashboardcounters")
@@ -1,10 +1,10 @@
 from __future__ import annotations
 
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Any
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import select
-from ..database import get_session
-from ..models import Asset, Destination, EventLog, Job, Preset, Schedule, ScheduleMode, Session
+from ..database import async_session_factory, get_session
+from ..models import DASHBOARD_COUNTERS_ID, Asset, DashboardCounters, Destination, EventLog, Job, Preset, Schedule, ScheduleMode, Session
 from ..schemas import (
     AssetCreate,
     AssetRead,
@@ -22,32 +22,57 @@ from ..schemas import (
     SessionRead,
     UploadResponse,
 )
+from ..services.dashboard import bump_counters
 from ..services.jobs import evaluate_license
-from ..services.scheduler import scheduler
+from ..services.scheduler import scheduler, utcnow
+from ..services.search import filter_assets
 from ..utils.auth import get_api_key
 
 router = APIRouter(dependencies=[Depends(get_api_key)])
 
+PAGE_LIMIT = Query(100, ge=1, le=1000)
+PAGE_OFFSET = Query(0, ge=0)
+
+
+def _read_columns(model: Any, schema: Any) -> list[Any]:
+    return [getattr(model, name) for name in schema.model_fields]
+
+
+def _get_or_404(session, model: Any, ident: int) -> Any:
+    # Foreign keys are enforced, so unknown references are rejected here instead of
+    # surfacing as an IntegrityError at flush.
+    obj = session.get(model, ident)
+    if obj is None:
+        raise HTTPException(status_code=404, detail=f"{model.__name__} not found")
+    return obj
+
+
+def _fetch_page(session, model: Any, statement: Any, limit: int, offset: int) -> list[dict[str, Any]]:
+    # Plain mappings; the route's response_model validates and serializes them.
+    rows = session.exec(statement.order_by(model.id).limit(limit).offset(offset)).all()
+    return [dict(row._mapping) for row in rows]
+
 
 @router.post("/assets", response_model=AssetRead)
 def create_asset(payload: AssetCreate):
     if payload.size_bytes and payload.size_bytes > 500 * 1024 * 1024:
         raise HTTPException(status_code=400, detail="Assets limited to 500MB uploads")
-    asset = Asset(**payload.dict())
+    asset = Asset(**payload.model_dump())
     with get_session() as session:
         session.add(asset)
+        session.exec(bump_counters(assets=1))
         session.commit()
         session.refresh(asset)
     return asset
 
 
 @router.get("/assets", response_model=list[AssetRead])
-def list_assets(query: str | None = None):
+def list_assets(query: str | None = None, limit: int = PAGE_LIMIT, offset: int = PAGE_OFFSET):
     with get_session() as session:
-        q = select(Asset)
+        q = select(*_read_columns(Asset, AssetRead))
         if query:
-            q = q.where(Asset.name.contains(query))
-        return session.exec(q).all()
+            q = filter_assets(session, q, query)
+        return _fetch_page(session, Asset, q, limit, offset)
 
 
 @router.post("/assets/{asset_id}/upload", response_model=UploadResponse)
@@ -65,121 +90,132 @@ def finish_upload(asset_id: int, analyzed_duration: int | None = None):
 
 @router.post("/destinations", response_model=DestinationRead)
 def create_destination(payload: DestinationCreate):
-    dest = Destination(**payload.dict())
+    dest = Destination(**payload.model_dump())
     with get_session() as session:
         session.add(dest)
+        session.exec(bump_counters(destinations=1))
         session.commit()
         session.refresh(dest)
     return dest
 
 
 @router.get("/destinations", response_model=list[DestinationRead])
-def list_destinations():
+def list_destinations(limit: int = PAGE_LIMIT, offset: int = PAGE_OFFSET):
     with get_session() as session:
-        return session.exec(select(Destination)).all()
+        q = select(*_read_columns(Destination, DestinationRead))
+        return _fetch_page(session, Destination, q, limit, offset)
 
 
 @router.post("/presets", response_model=PresetRead)
 def create_preset(payload: PresetCreate):
-    preset = Preset(**payload.dict())
+    preset = Preset(**payload.model_dump())
     with get_session() as session:
         session.add(preset)
+        session.exec(bump_counters(presets=1))
         session.commit()
         session.refresh(preset)
     return preset
 
 
 @router.get("/presets", response_model=list[PresetRead])
-def list_presets():
+def list_presets(limit: int = PAGE_LIMIT, offset: int = PAGE_OFFSET):
     with get_session() as session:
-        return session.exec(select(Preset)).all()
+        q = select(*_read_columns(Preset, PresetRead))
+        return _fetch_page(session, Preset, q, limit, offset)
 
 
 @router.post("/jobs", response_model=JobRead)
 def create_job(payload: JobCreate):
-    job = Job(**payload.dict())
+    job = Job(**payload.model_dump())
     with get_session() as session:
+        _get_or_404(session, Asset, payload.asset_id)
+        _get_or_404(session, Destination, payload.destination_id)
+        preset = _get_or_404(session, Preset, payload.preset_id)
         session.add(job)
-        session.commit()
+        session.flush()
+        evaluate_license(job, preset=preset, session=session)
         session.refresh(job)
-    return evaluate_license(job)
+    return job
 
 
 @router.get("/jobs", response_model=list[JobRead])
-def list_jobs(status: str | None = None):
+def list_jobs(status: str | None = None, limit: int = PAGE_LIMIT, offset: int = PAGE_OFFSET):
     with get_session() as session:
-        q = select(Job)
+        q = select(*_read_columns(Job, JobRead))
         if status:
             q = q.where(Job.status == status)
-        return session.exec(q).all()
+        return _fetch_page(session, Job, q, limit, offset)
 
 
 @router.post("/schedules", response_model=ScheduleRead)
-def create_schedule(payload: ScheduleCreate):
-    schedule = Schedule(**payload.dict())
-    with get_session() as session:
+async def create_schedule(payload: ScheduleCreate):
+    schedule = Schedule(**payload.model_dump())
+    async with async_session_factory() as session:
+        job = await session.get(Job, schedule.job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
         session.add(schedule)
-        session.commit()
-        session.refresh(schedule)
-    if schedule.run_now:
-        scheduler._process_schedule(schedule)
+        await session.flush()
+        if schedule.run_now:
+            await scheduler._process_schedule(session, schedule, job, utcnow())
+            await scheduler._flush_pending(session)
+        await session.commit()
+    scheduler.wake()
     return schedule
 
 
 @router.get("/schedules", response_model=list[ScheduleRead])
-def list_schedules():
+def list_schedules(limit: int = PAGE_LIMIT, offset: int = PAGE_OFFSET):
     with get_session() as session:
-        return session.exec(select(Schedule)).all()
+        q = select(*_read_columns(Schedule, ScheduleRead))
+        return _fetch_page(session, Schedule, q, limit, offset)
 
 
 @router.post("/run-now", response_model=SessionRead)
-def run_now(payload: RunNowRequest):
-    with get_session() as session:
-        schedule = session.get(Schedule, payload.schedule_id) if payload.schedule_id else None
-        job = session.get(Job, payload.job_id)
-    if job is None:
-        raise HTTPException(status_code=404, detail="Job not found")
-    if schedule is None:
-        schedule = Schedule(job_id=job.id, starts_at=datetime.utcnow(), mode=ScheduleMode.one_time, run_now=True)
-        with get_session() as session:
+async def run_now(payload: RunNowRequest):
+    async with async_session_factory() as session:
+        schedule = await session.get(Schedule, payload.schedule_id) if payload.schedule_id else None
+        job = await session.get(Job, payload.job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        now = utcnow()
+        if schedule is None:
+            schedule = Schedule(job_id=job.id, starts_at=now, mode=ScheduleMode.one_time, run_now=True)
             session.add(schedule)
-            session.commit()
-            session.refresh(schedule)
-    scheduler._process_schedule(schedule)
-    with get_session() as session:
-        session_obj = session.exec(select(Session).where(Session.job_id == job.id).order_by(Session.id.desc())).first()
+            await session.flush()
+        session_obj = await scheduler._process_schedule(session, schedule, job, now, planned_start=now)
+        await scheduler._flush_pending(session)
+        await session.commit()
         if not session_obj:
             raise HTTPException(status_code=500, detail="Failed to create session")
         return session_obj
 
 
 @router.get("/sessions", response_model=list[SessionRead])
-def list_sessions():
+def list_sessions(limit: int = PAGE_LIMIT, offset: int = PAGE_OFFSET):
     with get_session() as session:
-        return session.exec(select(Session)).all()
+        q = select(*_read_columns(Session, SessionRead))
+        return _fetch_page(session, Session, q, limit, offset)
 
 
 @router.get("/events", response_model=list[EventLogRead])
-def list_events():
+def list_events(limit: int = PAGE_LIMIT, offset: int = PAGE_OFFSET):
     with get_session() as session:
-        return session.exec(select(EventLog)).all()
+        q = select(*_read_columns(EventLog, EventLogRead))
+        return _fetch_page(session, EventLog, q, limit, offset)
 
 
 @router.get("/dashboard", response_model=DashboardSummary)
 def dashboard_summary():
     with get_session() as session:
-        streams = session.exec(select(Session)).all()
-        assets = session.exec(select(Asset)).all()
-        destinations = session.exec(select(Destination)).all()
-        presets = session.exec(select(Preset)).all()
-        jobs = session.exec(select(Job)).all()
-        invalid_jobs = [j for j in jobs if j.invalid_reason]
-        active_sessions = [s for s in streams if s.status == "running"]
-    return DashboardSummary(
-        streams=len(streams),
-        assets=len(assets),
-        destinations=len(destinations),
-        presets=len(presets),
-        active_sessions=len(active_sessions),
-        invalid_jobs=len(invalid_jobs),
-    )
+        counters = session.get(DashboardCounters, DASHBOARD_COUNTERS_ID)
+        if counters is None:
+            raise HTTPException(status_code=500, detail="Dashboard counters not initialized")
+        return DashboardSummary(
+            streams=counters.streams,
+            assets=counters.assets,
+            destinations=counters.destinations,
+            presets=counters.presets,
+            active_sessions=counters.active_sessions,
+            invalid_jobs=counters.invalid_jobs,
+        )
@@ -3,24 +3,32 @@ from __future__ import annotations
 import os
 import uuid
 from datetime import timedelta
-from pydantic import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
     database_url: str = "sqlite:///./zstrm.db"
+    pool_size: int = 20
+    max_overflow: int = 10
+    pool_recycle_seconds: int = 3600
+    query_cache_size: int = 2000
     api_key: str = "dev-key"
     runner_id: str = os.getenv("HOSTNAME", str(uuid.uuid4()))
     license_endpoint: str = "https://licenses.example.com/renew"
     install_id: str = str(uuid.uuid4())
     install_secret: str = str(uuid.uuid4())
     scheduler_tick_seconds: int = 60
+    scheduler_idle_seconds: int = 600
+    scheduler_skip_locked: bool = False
+    scheduler_batch_size: int = 100
+    scheduler_concurrency: int = 4
     licensing_grace_hours: int = 6
     licensing_retry_backoff_minutes: int = 5
+    licensing_retry_max_backoff_seconds: int = 3600
     licensing_retry_window_minutes: int = 30
     license_lease_hours: int = 1
 
-    class Config:
-        env_file = ".env"
+    model_config = SettingsConfigDict(env_file=".env")
 
 
 settings = Settings()
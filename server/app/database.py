@@ -1,18 +1,157 @@
 from __future__ import annotations
 
+import asyncio
 from contextlib import contextmanager
-from typing import Iterator
+from datetime import datetime
+from typing import Any, Iterator, Optional
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import URL, Connection, make_url
+from sqlalchemy.ext.asyncio import AsyncConnection, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 from .config import settings
 
-engine = create_engine(settings.database_url, connect_args={"check_same_thread": False})
+IS_SQLITE = make_url(settings.database_url).get_backend_name() == "sqlite"
+
+engine = create_engine(
+    settings.database_url,
+    connect_args={"check_same_thread": False} if IS_SQLITE else {},
+    pool_size=settings.pool_size,
+    max_overflow=settings.max_overflow,
+    pool_pre_ping=True,
+    pool_recycle=settings.pool_recycle_seconds,
+    query_cache_size=settings.query_cache_size,
+)
+
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA foreign_keys=ON",
+)
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def _async_url(database_url: str) -> URL:
+    url = make_url(database_url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+
+async_engine = create_async_engine(
+    _async_url(settings.database_url),
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=settings.pool_size,
+    max_overflow=settings.max_overflow,
+    pool_pre_ping=True,
+    pool_recycle=settings.pool_recycle_seconds,
+    query_cache_size=settings.query_cache_size,
+)
+async_session_factory = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+def _disable_pysqlite_transactions(dbapi_connection, connection_record) -> None:
+    # Let SQLAlchemy emit BEGIN itself so SAVEPOINTs nest inside the outer transaction.
+    dbapi_connection.isolation_level = None
+
+
+def _begin_sqlite_transaction(connection) -> None:
+    # Scheduler transactions read before they write. A deferred BEGIN would pin a WAL
+    # snapshot and fail with "database is locked" once another writer commits, so
+    # take the write lock up front and let busy_timeout queue writers instead.
+    connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+if IS_SQLITE:
+    event.listen(engine, "connect", _apply_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    # Only the async engine needs SAVEPOINTs (per-schedule rollbacks in the scheduler);
+    # the sync API engine keeps pysqlite's implicit transactions.
+    event.listen(async_engine.sync_engine, "connect", _disable_pysqlite_transactions)
+    event.listen(async_engine.sync_engine, "begin", _begin_sqlite_transaction)
+
+
+def dialect_insert(model: Any) -> Any:
+    """Return an INSERT supporting ON CONFLICT clauses for the configured backend."""
+    if IS_SQLITE:
+        return sqlite_insert(model)
+    return postgresql_insert(model)
+
+
+def _ensure_license_state(session: Session) -> None:
+    from .models import LICENSE_STATE_ID, LicenseState, LicenseTier
+
+    if session.get(LicenseState, LICENSE_STATE_ID) is not None:
+        return
+    session.add(
+        LicenseState(
+            id=LICENSE_STATE_ID,
+            tier=LicenseTier.basic,
+            install_id=settings.install_id,
+            install_secret=settings.install_secret,
+            lease_expires_at=datetime.utcnow(),
+        )
+    )
+    session.commit()
 
 
 def init_db() -> None:
+    from .services.dashboard import ensure_counters
+    from .services.notifications import ensure_schedule_notify
+    from .services.search import ensure_asset_fts
+
     SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        ensure_counters(session)
+        _ensure_license_state(session)
+        ensure_asset_fts(session)
+        ensure_schedule_notify(session)
+
+
+async def warm_pool() -> None:
+    # Check out pool_size connections from both engines at once so they are all opened
+    # in parallel, then hand them back to their pools.
+    results = await asyncio.gather(
+        *(asyncio.to_thread(engine.connect) for _ in range(settings.pool_size)),
+        *(async_engine.connect() for _ in range(settings.pool_size)),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, AsyncConnection):
+            await result.close()
+        elif isinstance(result, Connection):
+            result.close()
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
 
 
 @contextmanager
 def get_session() -> Iterator[Session]:
     with Session(engine) as session:
         yield session
+
+
+@contextmanager
+def reuse_session(session: Optional[Session] = None) -> Iterator[Session]:
+    if session is not None:
+        yield session
+        return
+    with get_session() as new_session:
+        yield new_session
@@ -2,25 +2,33 @@ from __future__ import annotations
 
 import asyncio
 from fastapi import Depends, FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from .api.routes import router as api_router
 from .config import settings
-from .database import init_db
+from .database import init_db, warm_pool
 from .services.jobs import downgrade_jobs
 from .services.licensing import licensing_client
 from .services.scheduler import scheduler
 from .utils.auth import get_api_key
 
-app = FastAPI(title="ZSTRM Backend")
+app = FastAPI(title="ZSTRM Backend", default_response_class=ORJSONResponse)
 app.mount("/static", StaticFiles(directory="server/app/static"), name="static")
 
 
 @app.on_event("startup")
 async def startup() -> None:
-    init_db()
+    await asyncio.to_thread(init_db)
+    await asyncio.to_thread(licensing_client.load_state)
+    await asyncio.gather(warm_pool(), asyncio.to_thread(downgrade_jobs))
     licensing_client.start()
     scheduler.start()
-    downgrade_jobs()
+
+
+@app.on_event("shutdown")
+async def shutdown() -> None:
+    await scheduler.stop()
+    await licensing_client.stop()
 
 
 @app.get("/health")
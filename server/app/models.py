@@ -2,10 +2,43 @@ from __future__ import annotations
 
 from datetime import datetime, timedelta
 from enum import Enum
-from typing import Optional
+from typing import Any, Optional
+from sqlalchemy import DateTime, Index, UniqueConstraint, event
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
 from sqlmodel import Field, SQLModel
 
 
+class utc_now(FunctionElement):
+    """Current UTC time with sub-second precision, as a naive timestamp.
+
+    Matches the naive-UTC datetimes written from Python; plain ``now()`` is
+    session-local on Postgres and only second-precise on SQLite.
+    """
+
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utc_now)
+def _utc_now_default(element: utc_now, compiler: Any, **kw: Any) -> str:
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(utc_now, "postgresql")
+def _utc_now_postgresql(element: utc_now, compiler: Any, **kw: Any) -> str:
+    return "timezone('utc', now())"
+
+
+@compiles(utc_now, "sqlite")
+def _utc_now_sqlite(element: utc_now, compiler: Any, **kw: Any) -> str:
+    return "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+
+def server_timestamp() -> Any:
+    return Field(sa_column_kwargs={"server_default": utc_now()})
+
+
 class LicenseTier(str, Enum):
     basic = "basic"
     premium = "premium"
@@ -20,7 +53,7 @@ class Asset(SQLModel, table=True):
     duration_seconds: Optional[int] = None
     thumbnail_path: Optional[str] = None
     audio_only: bool = False
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = server_timestamp()
 
 
 class Destination(SQLModel, table=True):
@@ -29,7 +62,7 @@ class Destination(SQLModel, table=True):
     endpoint: str
     stream_key: Optional[str] = None
     enabled: bool = True
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = server_timestamp()
 
 
 class PresetType(str, Enum):
@@ -49,6 +82,20 @@ class HotSwapMode(str, Enum):
     next_loop = "next_loop"
 
 
+TIER_RANK = {LicenseTier.basic: 0, LicenseTier.premium: 1, LicenseTier.ultimate: 2}
+AUDIO_REPLACE_NEEDS_PREMIUM = frozenset({AudioReplaceMode.external_loop, AudioReplaceMode.video_only})
+HOT_SWAP_NEEDS_PREMIUM = frozenset({HotSwapMode.immediate, HotSwapMode.next_loop})
+HOT_SWAP_NEEDS_ULTIMATE = frozenset({HotSwapMode.immediate})
+
+
+def required_tier(audio_replace: AudioReplaceMode, hot_swap: HotSwapMode) -> LicenseTier:
+    if hot_swap in HOT_SWAP_NEEDS_ULTIMATE:
+        return LicenseTier.ultimate
+    if audio_replace in AUDIO_REPLACE_NEEDS_PREMIUM or hot_swap in HOT_SWAP_NEEDS_PREMIUM:
+        return LicenseTier.premium
+    return LicenseTier.basic
+
+
 class Preset(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
@@ -58,7 +105,16 @@ class Preset(SQLModel, table=True):
     force_encode: bool = False
     audio_replace: AudioReplaceMode = Field(default=AudioReplaceMode.none)
     hot_swap: HotSwapMode = Field(default=HotSwapMode.none)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    min_tier: LicenseTier = Field(default=LicenseTier.basic)
+    created_at: datetime = server_timestamp()
+
+
+@event.listens_for(Preset, "before_insert")
+@event.listens_for(Preset, "before_update")
+def _derive_min_tier(mapper: Any, connection: Any, preset: Preset) -> None:
+    # min_tier is denormalised for set-based license checks; it is always derived
+    # from the feature columns so no write path can store a weaker tier.
+    preset.min_tier = required_tier(preset.audio_replace, preset.hot_swap)
 
 
 class JobStatus(str, Enum):
@@ -72,12 +128,12 @@ class JobStatus(str, Enum):
 
 class Job(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    asset_id: int = Field(foreign_key="asset.id")
-    destination_id: int = Field(foreign_key="destination.id")
-    preset_id: int = Field(foreign_key="preset.id")
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
-    status: JobStatus = Field(default=JobStatus.pending)
+    asset_id: int = Field(foreign_key="asset.id", index=True)
+    destination_id: int = Field(foreign_key="destination.id", index=True)
+    preset_id: int = Field(foreign_key="preset.id", index=True)
+    created_at: datetime = server_timestamp()
+    updated_at: datetime = server_timestamp()
+    status: JobStatus = Field(default=JobStatus.pending, index=True)
     invalid_reason: Optional[str] = None
     requested_at: Optional[datetime] = None
 
@@ -87,24 +143,40 @@ class ScheduleMode(str, Enum):
     windowed = "windowed"
 
 
+def _planned_end(context: Any) -> datetime:
+    params = context.get_current_parameters()
+    return params["starts_at"] + timedelta(minutes=params.get("duration_minutes") or 0)
+
+
 class Schedule(SQLModel, table=True):
+    __table_args__ = (Index("ix_schedule_window", "starts_at", "ends_at"),)
+    __mapper_args__ = {"eager_defaults": True}
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    job_id: int = Field(foreign_key="job.id")
+    job_id: int = Field(foreign_key="job.id", index=True)
     starts_at: datetime
     ends_at: Optional[datetime] = None
     duration_minutes: Optional[int] = None
     mode: ScheduleMode = Field(default=ScheduleMode.one_time)
     loop: bool = False
     run_now: bool = False
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    planned_end_at: Optional[datetime] = Field(default=None, sa_column_kwargs={"default": _planned_end})
+    created_at: datetime = server_timestamp()
     last_run_at: Optional[datetime] = None
 
 
 class Session(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_session_job_id_desc", "job_id", "id"),
+        UniqueConstraint("schedule_id", "planned_start", name="uq_session_schedule_planned_start"),
+    )
+    __mapper_args__ = {"eager_defaults": True}
+
     id: Optional[int] = Field(default=None, primary_key=True)
     schedule_id: int = Field(foreign_key="schedule.id")
-    job_id: int = Field(foreign_key="job.id")
-    started_at: datetime = Field(default_factory=datetime.utcnow)
+    job_id: int = Field(foreign_key="job.id", index=True)
+    planned_start: Optional[datetime] = None
+    started_at: datetime = server_timestamp()
     ended_at: Optional[datetime] = None
     status: JobStatus = Field(default=JobStatus.running)
     ffmpeg_log_path: Optional[str] = None
@@ -123,27 +195,43 @@ class EventType(str, Enum):
 
 class EventLog(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    session_id: Optional[int] = Field(default=None, foreign_key="session.id")
-    job_id: Optional[int] = Field(default=None, foreign_key="job.id")
-    schedule_id: Optional[int] = Field(default=None, foreign_key="schedule.id")
+    session_id: Optional[int] = Field(default=None, foreign_key="session.id", index=True)
+    job_id: Optional[int] = Field(default=None, foreign_key="job.id", index=True)
+    schedule_id: Optional[int] = Field(default=None, foreign_key="schedule.id", index=True)
     event_type: EventType
     message: str
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = server_timestamp()
+
+
+LICENSE_STATE_ID = 1
 
 
 class LicenseState(SQLModel, table=True):
-    id: Optional[int] = Field(default=None, primary_key=True)
+    id: Optional[int] = Field(default=LICENSE_STATE_ID, primary_key=True)
     tier: LicenseTier = Field(default=LicenseTier.basic)
     install_id: str
     install_secret: str
     lease_expires_at: datetime
     grace_expires_at: Optional[datetime] = None
-    last_checked_at: datetime = Field(default_factory=datetime.utcnow)
+    last_checked_at: datetime = server_timestamp()
 
 
 class RunnerLock(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    lock_name: str = Field(index=True)
+    lock_name: str = Field(index=True, unique=True)
     locked_by: str
-    locked_at: datetime = Field(default_factory=datetime.utcnow)
+    locked_at: datetime = server_timestamp()
     expires_at: datetime
+
+
+DASHBOARD_COUNTERS_ID = 1
+
+
+class DashboardCounters(SQLModel, table=True):
+    id: Optional[int] = Field(default=DASHBOARD_COUNTERS_ID, primary_key=True)
+    streams: int = 0
+    assets: int = 0
+    destinations: int = 0
+    presets: int = 0
+    active_sessions: int = 0
+    invalid_jobs: int = 0
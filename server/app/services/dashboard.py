@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from sqlalchemy import update
+from sqlalchemy.sql.expression import Update
+from sqlmodel import Session as DBSession, func, select
+from ..models import DASHBOARD_COUNTERS_ID, Asset, DashboardCounters, Destination, Job, JobStatus, Preset, Session
+
+
+def _invalid_jobs_count():
+    return select(func.count(Job.id)).where(Job.invalid_reason.is_not(None)).scalar_subquery()
+
+
+def aggregate_counts():
+    return select(
+        select(func.count(Session.id)).scalar_subquery().label("streams"),
+        select(func.count(Asset.id)).scalar_subquery().label("assets"),
+        select(func.count(Destination.id)).scalar_subquery().label("destinations"),
+        select(func.count(Preset.id)).scalar_subquery().label("presets"),
+        select(func.count(Session.id)).where(Session.status == JobStatus.running).scalar_subquery().label("active_sessions"),
+        _invalid_jobs_count().label("invalid_jobs"),
+    )
+
+
+def bump_counters(**deltas: int) -> Update:
+    values = {name: getattr(DashboardCounters, name) + delta for name, delta in deltas.items()}
+    return update(DashboardCounters).where(DashboardCounters.id == DASHBOARD_COUNTERS_ID).values(values)
+
+
+def recount_invalid_jobs() -> Update:
+    return (
+        update(DashboardCounters)
+        .where(DashboardCounters.id == DASHBOARD_COUNTERS_ID)
+        .values(invalid_jobs=_invalid_jobs_count())
+    )
+
+
+def ensure_counters(session: DBSession) -> None:
+    if session.get(DashboardCounters, DASHBOARD_COUNTERS_ID) is not None:
+        return
+    row = session.exec(aggregate_counts()).one()
+    session.add(DashboardCounters(id=DASHBOARD_COUNTERS_ID, **row._mapping))
+    session.commit()
@@ -1,53 +1,126 @@
 from __future__ import annotations
 
 from datetime import datetime
-from sqlmodel import select
-from ..database import get_session
-from ..models import EventLog, EventType, Job, JobStatus, LicenseTier, Preset
+from typing import Any, Optional
+from sqlalchemy import and_, or_, update
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlmodel import Session as DBSession, select
+from ..database import get_session, reuse_session
+from ..models import (
+    AUDIO_REPLACE_NEEDS_PREMIUM,
+    HOT_SWAP_NEEDS_PREMIUM,
+    TIER_RANK,
+    EventLog,
+    EventType,
+    Job,
+    JobStatus,
+    LicenseTier,
+    Preset,
+)
+from .dashboard import bump_counters, recount_invalid_jobs
 from .licensing import licensing_client
 
 
-INVALID_PREMIUM_FEATURES = {
-    "audio_replace": ["premium", "ultimate"],
-    "hot_swap": ["premium", "ultimate"],
-}
+def _write_job_status(session: DBSession, job: Job, status: JobStatus, reason: Optional[str]) -> None:
+    values = {"status": status, "invalid_reason": reason, "updated_at": datetime.utcnow()}
+    session.exec(
+        update(Job).where(Job.id == job.id).values(**values).execution_options(synchronize_session=False)
+    )
+    for name, value in values.items():
+        set_committed_value(job, name, value)
 
 
-def invalidate_job(job: Job, reason: str) -> Job:
-    job.status = JobStatus.invalid
-    job.invalid_reason = reason
-    job.updated_at = datetime.utcnow()
-    with get_session() as session:
-        session.add(job)
+def invalidate_job(job: Job, reason: str, session: Optional[DBSession] = None) -> Job:
+    was_invalid = job.invalid_reason is not None
+    with reuse_session(session) as session:
+        _write_job_status(session, job, JobStatus.invalid, reason)
         session.add(EventLog(job_id=job.id, event_type=EventType.invalidated, message=reason))
+        if not was_invalid:
+            session.exec(bump_counters(invalid_jobs=1))
         session.commit()
     return job
 
 
-def evaluate_license(job: Job) -> Job:
+def license_violation(preset: Optional[Preset], tier: LicenseTier) -> Optional[str]:
+    if preset is None:
+        # Unreachable through the API; kept for rows written before foreign keys were
+        # enforced, since SQLite does not re-check existing rows when they are enabled.
+        return "Missing preset"
+    if TIER_RANK[tier] >= TIER_RANK[preset.min_tier]:
+        return None
+    if TIER_RANK[tier] < TIER_RANK[LicenseTier.premium]:
+        if preset.audio_replace in AUDIO_REPLACE_NEEDS_PREMIUM:
+            return "Audio replace requires Premium"
+        if preset.hot_swap in HOT_SWAP_NEEDS_PREMIUM:
+            return "Hot swap requires Premium"
+    return "Immediate swaps require Ultimate"
+
+
+def evaluate_license(job: Job, preset: Optional[Preset] = None, session: Optional[DBSession] = None) -> Job:
     tier = licensing_client.get_tier()
-    with get_session() as session:
-        preset = session.get(Preset, job.preset_id)
     if preset is None:
-        return invalidate_job(job, "Missing preset")
-    if tier == LicenseTier.basic:
-        if preset.audio_replace.value != "none":
-            return invalidate_job(job, "Audio replace requires Premium")
-        if preset.hot_swap.value != "none":
-            return invalidate_job(job, "Hot swap requires Premium")
-    if tier != LicenseTier.ultimate and preset.hot_swap.value == "immediate":
-        return invalidate_job(job, "Immediate swaps require Ultimate")
-    job.invalid_reason = None
-    job.status = JobStatus.pending
-    job.updated_at = datetime.utcnow()
-    with get_session() as session:
-        session.add(job)
+        with reuse_session(session) as lookup:
+            preset = lookup.get(Preset, job.preset_id)
+    reason = license_violation(preset, tier)
+    if reason:
+        return invalidate_job(job, reason, session=session)
+    was_invalid = job.invalid_reason is not None
+    with reuse_session(session) as session:
+        _write_job_status(session, job, JobStatus.pending, None)
+        if was_invalid:
+            session.exec(bump_counters(invalid_jobs=-1))
         session.commit()
     return job
 
 
+def _invalidation_buckets(tier: LicenseTier) -> list[tuple[str, Any]]:
+    # Dangling preset ids can only come from data written before foreign keys were enforced.
+    buckets: list[tuple[str, Any]] = [("Missing preset", Job.preset_id.not_in(select(Preset.id)))]
+    above = [candidate for candidate in LicenseTier if TIER_RANK[candidate] > TIER_RANK[tier]]
+    if not above:
+        return buckets
+    exceeds = Preset.min_tier.in_(above)
+    if tier == LicenseTier.basic:
+        preset_buckets = [
+            ("Audio replace requires Premium", and_(exceeds, Preset.audio_replace.in_(AUDIO_REPLACE_NEEDS_PREMIUM))),
+            ("Hot swap requires Premium", and_(exceeds, Preset.audio_replace.not_in(AUDIO_REPLACE_NEEDS_PREMIUM))),
+        ]
+    else:
+        preset_buckets = [("Immediate swaps require Ultimate", exceeds)]
+    buckets.extend(
+        (reason, Job.preset_id.in_(select(Preset.id).where(condition))) for reason, condition in preset_buckets
+    )
+    return buckets
+
+
 def downgrade_jobs() -> None:
+    tier = licensing_client.get_tier()
+    now = datetime.utcnow()
+    fits = [candidate for candidate in LicenseTier if TIER_RANK[candidate] <= TIER_RANK[tier]]
+    events = []
     with get_session() as session:
-        jobs = session.exec(select(Job)).all()
-        for job in jobs:
-            evaluate_license(job)
+        for reason, condition in _invalidation_buckets(tier):
+            invalidated = session.exec(
+                update(Job)
+                .where(condition, or_(Job.status != JobStatus.invalid, Job.invalid_reason.is_distinct_from(reason)))
+                .values(status=JobStatus.invalid, invalid_reason=reason, updated_at=now)
+                .returning(Job.id)
+                .execution_options(synchronize_session=False)
+            ).scalars()
+            events.extend(
+                {"job_id": job_id, "event_type": EventType.invalidated, "message": reason}
+                for job_id in invalidated
+            )
+        session.exec(
+            update(Job)
+            .where(
+                Job.preset_id.in_(select(Preset.id).where(Preset.min_tier.in_(fits))),
+                or_(Job.status == JobStatus.invalid, Job.invalid_reason.is_not(None)),
+            )
+            .values(status=JobStatus.pending, invalid_reason=None, updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        if events:
+            session.bulk_insert_mappings(EventLog, events)
+        session.exec(recount_invalid_jobs())
+        session.commit()
@@ -1,85 +1,127 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
+import math
+import random
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 import httpx
-from sqlmodel import select
 from ..config import settings
-from ..database import get_session, init_db
-from ..models import EventLog, EventType, LicenseState, LicenseTier
+from ..database import get_session
+from ..models import LICENSE_STATE_ID, EventLog, EventType, LicenseState, LicenseTier
+
+
+class LicenseRenewalError(Exception):
+    """Renewal failed; ``state`` carries the persisted grace window."""
+
+    def __init__(self, state: LicenseState) -> None:
+        super().__init__("License renewal failed")
+        self.state = state
 
 
 def _load_license() -> LicenseState:
     with get_session() as session:
-        state = session.exec(select(LicenseState)).first()
-        if state is None:
-            state = LicenseState(
-                tier=LicenseTier.basic,
-                install_id=settings.install_id,
-                install_secret=settings.install_secret,
-                lease_expires_at=datetime.utcnow(),
-            )
-            session.add(state)
-            session.commit()
-            session.refresh(state)
-        return state
+        return session.get(LicenseState, LICENSE_STATE_ID)
+
+
+class LicensingClient:
+    def __init__(self) -> None:
+        # Loaded on first use (or by load_state at startup) so importing this module
+        # does not touch the database before init_db has run.
+        self._state: Optional[LicenseState] = None
+        self._task: Optional[asyncio.Task] = None
+        self._cached_tier: LicenseTier = LicenseTier.basic
+        self._cache_until: float = 0.0
+        self._http: Optional[httpx.AsyncClient] = None
+
+    @property
+    def state(self) -> LicenseState:
+        if self._state is None:
+            self._state = _load_license()
+        return self._state
+
+    @state.setter
+    def state(self, state: LicenseState) -> None:
+        self._state = state
+
+    def load_state(self) -> None:
+        self._state = _load_license()
+        self._invalidate_tier_cache()
 
+    def _client(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=5)
+        return self._http
 
-async def renew_license(state: LicenseState) -> LicenseState:
-    payload = {"install_id": state.install_id, "secret": state.install_secret}
-    async with httpx.AsyncClient() as client:
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def renew_license(self, state: LicenseState) -> LicenseState:
+        payload = {"install_id": state.install_id, "secret": state.install_secret}
+        failure: Optional[Exception] = None
         try:
-            resp = await client.post(settings.license_endpoint, json=payload, timeout=5)
+            resp = await self._client().post(settings.license_endpoint, json=payload)
             resp.raise_for_status()
             data = resp.json()
             state.tier = LicenseTier(data.get("tier", state.tier.value))
             state.lease_expires_at = datetime.utcnow() + timedelta(hours=settings.license_lease_hours)
             state.grace_expires_at = None
             result_event = EventType.upgraded
-        except Exception:
+        except Exception as exc:
+            failure = exc
             state.grace_expires_at = datetime.utcnow() + timedelta(hours=settings.licensing_grace_hours)
             result_event = EventType.downgraded
-    with get_session() as session:
-        persisted = session.exec(select(LicenseState)).first()
-        if persisted:
-            for field in ["tier", "lease_expires_at", "grace_expires_at"]:
-                setattr(persisted, field, getattr(state, field))
-            persisted.last_checked_at = datetime.utcnow()
-            session.add(persisted)
-            session.add(
-                EventLog(
-                    event_type=result_event,
-                    message=f"License {result_event.value} at {datetime.utcnow().isoformat()}",
+        with get_session() as session:
+            persisted = session.get(LicenseState, LICENSE_STATE_ID)
+            if persisted:
+                for field in ["tier", "lease_expires_at", "grace_expires_at"]:
+                    setattr(persisted, field, getattr(state, field))
+                persisted.last_checked_at = datetime.utcnow()
+                session.add(persisted)
+                session.add(
+                    EventLog(
+                        event_type=result_event,
+                        message=f"License {result_event.value} at {datetime.utcnow().isoformat()}",
+                    )
                 )
-            )
-            session.commit()
-            session.refresh(persisted)
-            state = persisted
-    return state
+                session.commit()
+                session.refresh(persisted)
+                state = persisted
+        if failure is not None:
+            raise LicenseRenewalError(state) from failure
+        return state
 
-
-class LicensingClient:
-    def __init__(self) -> None:
-        init_db()
-        self.state: LicenseState = _load_license()
-        self._task: Optional[asyncio.Task] = None
+    def _invalidate_tier_cache(self) -> None:
+        self._cache_until = 0.0
 
     def get_tier(self) -> LicenseTier:
+        if time.monotonic() < self._cache_until:
+            return self._cached_tier
         now = datetime.utcnow()
         if self.state.lease_expires_at < now:
             if self.state.grace_expires_at and self.state.grace_expires_at > now:
-                return self.state.tier
-            return LicenseTier.basic
-        return self.state.tier
+                tier, valid_until = self.state.tier, self.state.grace_expires_at
+            else:
+                tier, valid_until = LicenseTier.basic, None
+        else:
+            tier, valid_until = self.state.tier, self.state.lease_expires_at
+        ttl = (valid_until - now).total_seconds() if valid_until else math.inf
+        self._cached_tier = tier
+        self._cache_until = time.monotonic() + ttl
+        return tier
 
     def downgrade_if_needed(self) -> None:
         if self.get_tier() == LicenseTier.basic and self.state.tier != LicenseTier.basic:
             self.state.tier = LicenseTier.basic
+            self._invalidate_tier_cache()
             from .jobs import downgrade_jobs
 
             with get_session() as session:
-                db_state = session.exec(select(LicenseState)).first()
+                db_state = session.get(LicenseState, LICENSE_STATE_ID)
                 if db_state:
                     db_state.tier = LicenseTier.basic
                     db_state.grace_expires_at = datetime.utcnow() + timedelta(hours=settings.licensing_grace_hours)
@@ -94,24 +136,47 @@ class LicensingClient:
             downgrade_jobs()
 
     async def _run(self) -> None:
+        base_backoff = settings.licensing_retry_backoff_minutes * 60
+        backoff = base_backoff
         retry_deadline = datetime.utcnow() + timedelta(minutes=settings.licensing_retry_window_minutes)
-        while True:
-            now = datetime.utcnow()
-            if now >= self.state.lease_expires_at:
-                self.downgrade_if_needed()
-            try:
-                self.state = await renew_license(self.state)
-                retry_deadline = datetime.utcnow() + timedelta(minutes=settings.licensing_retry_window_minutes)
-            except Exception:
+        try:
+            while True:
+                now = datetime.utcnow()
+                if now >= self.state.lease_expires_at:
+                    self.downgrade_if_needed()
+                try:
+                    self.state = await self.renew_license(self.state)
+                except LicenseRenewalError as exc:
+                    # The grace window was persisted; adopt it before backing off.
+                    self.state = exc.state
+                    self._invalidate_tier_cache()
+                except Exception:
+                    pass
+                else:
+                    self._invalidate_tier_cache()
+                    retry_deadline = datetime.utcnow() + timedelta(minutes=settings.licensing_retry_window_minutes)
+                    backoff = base_backoff
+                    await asyncio.sleep(settings.license_lease_hours * 3600)
+                    continue
                 if datetime.utcnow() > retry_deadline:
                     self.downgrade_if_needed()
-                await asyncio.sleep(settings.licensing_retry_backoff_minutes * 60)
-                continue
-            await asyncio.sleep(settings.license_lease_hours * 3600)
+                await asyncio.sleep(backoff + random.uniform(0, backoff * 0.1))
+                backoff = min(backoff * 2, settings.licensing_retry_max_backoff_seconds)
+        except asyncio.CancelledError:
+            await self.aclose()
+            raise
 
     def start(self) -> None:
         if self._task is None:
             self._task = asyncio.create_task(self._run())
 
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.aclose()
+
 
 licensing_client = LicensingClient()
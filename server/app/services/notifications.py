@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from sqlalchemy import text
+from sqlmodel import Session as DBSession
+
+SCHEDULE_CHANNEL = "schedule_changes"
+
+# Only columns that move a schedule's window notify; last_run_at updates from
+# the scheduler itself must not wake every runner.
+SCHEDULE_NOTIFY_DDL = (
+    "CREATE OR REPLACE FUNCTION notify_schedule_changes() RETURNS trigger AS $$ BEGIN "
+    f"PERFORM pg_notify('{SCHEDULE_CHANNEL}', NEW.id::text); RETURN NEW; END; $$ LANGUAGE plpgsql",
+    "DROP TRIGGER IF EXISTS schedule_changes_notify ON schedule",
+    "CREATE TRIGGER schedule_changes_notify "
+    'AFTER INSERT OR UPDATE OF starts_at, ends_at, duration_minutes, mode, "loop" ON schedule '
+    "FOR EACH ROW EXECUTE FUNCTION notify_schedule_changes()",
+)
+
+
+def notify_enabled(session: DBSession) -> bool:
+    return session.get_bind().dialect.name == "postgresql"
+
+
+def ensure_schedule_notify(session: DBSession) -> None:
+    if not notify_enabled(session):
+        return
+    for statement in SCHEDULE_NOTIFY_DDL:
+        session.exec(text(statement))
+    session.commit()
@@ -1,33 +1,61 @@
 from __future__ import annotations
 
-from ..models import AudioReplaceMode, Job, PresetType
-
-
-def build_pipeline_summary(job: Job) -> str:
-    preset = None
-    asset = None
-    destination = None
-    try:
-        from sqlmodel import select
-        from ..database import get_session
-        from ..models import Asset, Destination, Preset
-
-        with get_session() as session:
-            preset = session.get(Preset, job.preset_id)
-            asset = session.get(Asset, job.asset_id)
-            destination = session.get(Destination, job.destination_id)
-    except Exception:
-        preset = None
-    preset_part = preset.name if preset else "copy"
-    if preset and preset.preset_type == PresetType.encode:
-        preset_part = f"encode-v{preset.video_bitrate or 'auto'}-a{preset.audio_bitrate or 'auto'}"
-    audio_part = "audio" if asset and not asset.audio_only else "video-only"
-    dest_part = destination.endpoint if destination else "unknown-dest"
+import functools
+from typing import Optional
+
+from sqlalchemy import bindparam
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..models import Asset, AudioReplaceMode, Destination, Job, Preset, PresetType
+
+# Only the columns the summary reads, outer-joined so a missing row renders its defaults.
+_SUMMARY_STMT = (
+    select(
+        Preset.name,
+        Preset.preset_type,
+        Preset.video_bitrate,
+        Preset.audio_bitrate,
+        Preset.force_encode,
+        Preset.audio_replace,
+        Asset.audio_only,
+        Destination.endpoint,
+    )
+    .select_from(Job)
+    .outerjoin(Preset, Preset.id == Job.preset_id)
+    .outerjoin(Asset, Asset.id == Job.asset_id)
+    .outerjoin(Destination, Destination.id == Job.destination_id)
+    .where(Job.id == bindparam("job_id"))
+)
+
+
+@functools.lru_cache(maxsize=1024)
+def _render_summary(
+    preset_name: Optional[str],
+    preset_type: Optional[PresetType],
+    video_bitrate: Optional[int],
+    audio_bitrate: Optional[int],
+    force_encode: Optional[bool],
+    audio_replace: Optional[AudioReplaceMode],
+    audio_only: Optional[bool],
+    endpoint: Optional[str],
+) -> str:
+    # Keyed on the values themselves, so an edited row simply misses the cache.
+    preset_part = preset_name if preset_name is not None else "copy"
+    if preset_type == PresetType.encode:
+        preset_part = f"encode-v{video_bitrate or 'auto'}-a{audio_bitrate or 'auto'}"
+    audio_part = "audio" if audio_only is False else "video-only"
+    dest_part = endpoint if endpoint is not None else "unknown-dest"
     ffmpeg_flags = ["-re"]
-    if preset and preset.preset_type == PresetType.copy and not preset.force_encode:
+    if preset_type == PresetType.copy and not force_encode:
         ffmpeg_flags.append("-c copy")
-    if preset and preset.audio_replace == AudioReplaceMode.external_loop:
+    if audio_replace == AudioReplaceMode.external_loop:
         ffmpeg_flags.append("-stream_loop -1 -i external_audio.mp3")
-    if preset and preset.audio_replace == AudioReplaceMode.video_only:
+    if audio_replace == AudioReplaceMode.video_only:
         ffmpeg_flags.append("-an")
     return f"ffmpeg {' '.join(ffmpeg_flags)} // preset={preset_part} // {audio_part} -> {dest_part}"
+
+
+async def build_pipeline_summary(session: AsyncSession, job: Job) -> str:
+    row = (await session.exec(_SUMMARY_STMT, params={"job_id": job.id})).one()
+    return _render_summary(*row)
@@ -1,11 +1,17 @@
 from __future__ import annotations
 
 import asyncio
-from datetime import datetime, timedelta
-from typing import Optional
+import contextlib
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+from sqlalchemy import bindparam, func, insert, inspect, or_, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection
 from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from ..config import settings
-from ..database import get_session
+from ..database import IS_SQLITE, async_engine, async_session_factory, dialect_insert
 from ..models import (
     EventLog,
     EventType,
@@ -17,55 +23,216 @@ from ..models import (
     ScheduleMode,
     Session,
 )
+from .dashboard import bump_counters
 from .licensing import licensing_client
+from .notifications import SCHEDULE_CHANNEL
 from .pipeline import build_pipeline_summary
 
 
+SCHEDULER_LOCK_NAME = "scheduler"
+LEASE_TICKS = 5
+LEASE_RENEW_TICKS = 2
+
+logger = logging.getLogger(__name__)
+
+
+def utcnow() -> datetime:
+    # Stored timestamps are naive UTC, so drop tzinfo to keep comparisons valid.
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _build_due_statement(sharded: bool) -> Any:
+    now = bindparam("now")
+    statement = (
+        select(Schedule, Job)
+        .join(Job, Schedule.job_id == Job.id)
+        .where(
+            Schedule.id > bindparam("after_id"),
+            Schedule.starts_at <= now,
+            or_(Schedule.ends_at.is_(None), Schedule.ends_at >= now),
+            # Non-looping windows past their planned end never run again (see _should_run).
+            or_(
+                Schedule.mode != ScheduleMode.windowed,
+                Schedule.loop,
+                Schedule.planned_end_at.is_(None),
+                Schedule.planned_end_at >= now,
+            ),
+        )
+        .order_by(Schedule.id)
+        .limit(settings.scheduler_batch_size)
+    )
+    if not sharded:
+        return statement
+    return statement.where(
+        or_(Schedule.last_run_at.is_(None), Schedule.last_run_at < bindparam("claimed_before"))
+    ).with_for_update(skip_locked=True, of=Schedule)
+
+
+# Built once so each tick reuses the same statements and their compiled-cache entries.
+_DUE_STMT = _build_due_statement(sharded=False)
+_SHARDED_DUE_STMT = _build_due_statement(sharded=True)
+_RETRY_STMT = (
+    select(Schedule, Job).join(Job, Schedule.job_id == Job.id).where(Schedule.id.in_(bindparam("ids", expanding=True)))
+)
+_NEXT_START_STMT = select(func.min(Schedule.starts_at)).where(
+    or_(Schedule.ends_at.is_(None), Schedule.ends_at >= bindparam("now"))
+)
+
+
 class Scheduler:
+    __slots__ = ("_task", "_lock_conn", "_lock_held", "_lease_until", "_listen_conn", "_listener", "_wakeup")
+
     def __init__(self) -> None:
         self._task: Optional[asyncio.Task] = None
+        self._lock_conn: Optional[AsyncConnection] = None
+        self._lock_held = False
+        self._lease_until: Optional[datetime] = None
+        self._listen_conn: Optional[AsyncConnection] = None
+        self._listener: Any = None
+        self._wakeup = asyncio.Event()
 
-    def _acquire_lock(self) -> bool:
-        with get_session() as session:
-            lock = session.exec(select(RunnerLock).where(RunnerLock.lock_name == "scheduler")).first()
-            now = datetime.utcnow()
-            if lock and lock.expires_at > now and lock.locked_by != settings.runner_id:
-                return False
-            expiration = now + timedelta(seconds=settings.scheduler_tick_seconds * 3)
-            if lock is None:
-                lock = RunnerLock(lock_name="scheduler", locked_by=settings.runner_id, expires_at=expiration)
-            else:
-                lock.locked_by = settings.runner_id
-                lock.expires_at = expiration
-                lock.locked_at = now
-            session.add(lock)
-            session.commit()
-            return True
+    async def _acquire_lock(self, now: datetime) -> bool:
+        if async_engine.dialect.name == "postgresql":
+            return await self._acquire_advisory_lock()
+        return await self._acquire_table_lock(now)
 
-    def _record_event(self, schedule_id: int, job_id: int, event_type: EventType, message: str) -> None:
-        with get_session() as session:
-            session.add(
-                EventLog(
-                    schedule_id=schedule_id,
-                    job_id=job_id,
-                    event_type=event_type,
-                    message=message,
+    async def _acquire_advisory_lock(self) -> bool:
+        try:
+            if self._lock_conn is None:
+                self._lock_conn = await async_engine.connect()
+                await self._lock_conn.execution_options(isolation_level="AUTOCOMMIT")
+            if self._lock_held:
+                await self._lock_conn.scalar(text("SELECT 1"))
+                return True
+            self._lock_held = bool(
+                await self._lock_conn.scalar(
+                    text("SELECT pg_try_advisory_lock(hashtext(:name))"), {"name": SCHEDULER_LOCK_NAME}
                 )
             )
-            session.commit()
+            return self._lock_held
+        except DBAPIError:
+            await self._release_lock_conn()
+            return False
+
+    async def _release_lock_conn(self) -> None:
+        self._lock_held = False
+        if self._lock_conn is not None:
+            await self._lock_conn.invalidate()
+            self._lock_conn = None
+
+    async def _acquire_table_lock(self, now: datetime) -> bool:
+        # A tick with retries runs _run_due, sleeps a tick and runs the retry batch, so
+        # it needs two ticks of lease left; the lease is long enough to span several.
+        tick = timedelta(seconds=settings.scheduler_tick_seconds)
+        if self._lease_until is not None and self._lease_until - now > tick * LEASE_RENEW_TICKS:
+            return True
+        expiration = now + tick * LEASE_TICKS
+        statement = dialect_insert(RunnerLock).values(
+            lock_name=SCHEDULER_LOCK_NAME, locked_by=settings.runner_id, locked_at=now, expires_at=expiration
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[RunnerLock.lock_name],
+            set_={
+                "locked_by": statement.excluded.locked_by,
+                "locked_at": statement.excluded.locked_at,
+                "expires_at": statement.excluded.expires_at,
+            },
+            where=or_(RunnerLock.locked_by == settings.runner_id, RunnerLock.expires_at <= now),
+        ).returning(RunnerLock.locked_by)
+        async with async_session_factory() as session:
+            holder = (await session.exec(statement)).scalar_one_or_none()
+            await session.commit()
+        if holder != settings.runner_id:
+            self._lease_until = None
+            return False
+        self._lease_until = expiration
+        return True
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    def _on_notify(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        self.wake()
+
+    async def _ensure_listener(self) -> None:
+        if async_engine.dialect.name != "postgresql":
+            return
+        if self._listener is not None and not self._listener.is_closed():
+            return
+        await self._release_listen_conn()
+        try:
+            self._listen_conn = await async_engine.connect()
+            await self._listen_conn.execution_options(isolation_level="AUTOCOMMIT")
+            raw = await self._listen_conn.get_raw_connection()
+            self._listener = raw.driver_connection
+            await self._listener.add_listener(SCHEDULE_CHANNEL, self._on_notify)
+        except Exception:
+            # Without a listener the loop still wakes on its timer.
+            await self._release_listen_conn()
+
+    async def _release_listen_conn(self) -> None:
+        self._listener = None
+        if self._listen_conn is not None:
+            await self._listen_conn.invalidate()
+            self._listen_conn = None
+
+    async def _next_delay(self, now: datetime) -> float:
+        # The table lock is a lease renewed each tick, so only lock-free modes may idle longer.
+        if async_engine.dialect.name != "postgresql":
+            return settings.scheduler_tick_seconds
+        async with async_session_factory() as session:
+            next_start = (await session.exec(_NEXT_START_STMT, params={"now": now})).one()
+        if next_start is None:
+            return settings.scheduler_idle_seconds
+        if next_start <= now:
+            return settings.scheduler_tick_seconds
+        return min((next_start - now).total_seconds(), settings.scheduler_idle_seconds)
+
+    async def _sleep(self, delay: float) -> None:
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._wakeup.wait(), delay)
+        self._wakeup.clear()
+
+    def _pending_events(self, session: AsyncSession) -> list[dict[str, Any]]:
+        return session.info.setdefault("pending_events", [])
 
-    def _should_run(self, schedule: Schedule) -> bool:
-        now = datetime.utcnow()
+    def _record_event(
+        self, session: AsyncSession, schedule_id: Optional[int], job_id: int, event_type: EventType, message: str
+    ) -> None:
+        self._pending_events(session).append(
+            {"schedule_id": schedule_id, "job_id": job_id, "event_type": event_type, "message": message}
+        )
+
+    def _pending_counters(self, session: AsyncSession) -> dict[str, int]:
+        return session.info.setdefault("pending_counters", {})
+
+    def _bump(self, session: AsyncSession, **deltas: int) -> None:
+        # Counter deltas are applied once per transaction in _flush_pending, so the
+        # shared DashboardCounters row is only locked for the commit itself.
+        pending = self._pending_counters(session)
+        for name, delta in deltas.items():
+            pending[name] = pending.get(name, 0) + delta
+
+    async def _flush_pending(self, session: AsyncSession) -> None:
+        events = session.info.pop("pending_events", None)
+        if events:
+            await session.exec(insert(EventLog), params=events)
+        deltas = {name: delta for name, delta in session.info.pop("pending_counters", {}).items() if delta}
+        if deltas:
+            await session.exec(bump_counters(**deltas))
+
+    def _is_due(self, schedule: Schedule, now: datetime) -> bool:
+        return schedule.starts_at <= now and (schedule.ends_at is None or schedule.ends_at >= now)
+
+    def _should_run(self, schedule: Schedule, now: datetime) -> bool:
         if schedule.mode == ScheduleMode.one_time:
-            return schedule.starts_at <= now and (schedule.ends_at is None or now <= schedule.ends_at)
+            return True
         planned_end = schedule.starts_at + timedelta(minutes=schedule.duration_minutes or 0)
-        if schedule.ends_at and now > schedule.ends_at:
-            return False
         if planned_end and now > planned_end and not schedule.loop:
             return False
         if schedule.mode == ScheduleMode.windowed and not schedule.loop and schedule.ends_at and schedule.ends_at > planned_end:
             return False
-        return schedule.starts_at <= now
+        return True
 
     def _validate_schedule(self, schedule: Schedule) -> Optional[str]:
         if schedule.mode == ScheduleMode.windowed and schedule.ends_at and schedule.duration_minutes:
@@ -74,33 +241,48 @@ class Scheduler:
                 return "Loop required when window exceeds duration"
         return None
 
-    def _start_session(self, schedule: Schedule, job: Job) -> Session:
-        with get_session() as session:
-            pipeline_summary = build_pipeline_summary(job)
-            sess = Session(schedule_id=schedule.id, job_id=job.id, ffmpeg_log_path=pipeline_summary)
-            job.status = JobStatus.running
-            job.updated_at = datetime.utcnow()
-            schedule.last_run_at = datetime.utcnow()
-            session.add(sess)
-            session.add(job)
-            session.add(schedule)
-            self._record_event(schedule.id, job.id, EventType.started, f"Session started with pipeline {pipeline_summary}")
-            session.commit()
-            session.refresh(sess)
-            return sess
-
-    def _complete_session(self, sess: Session, success: bool, reason: Optional[str] = None) -> None:
-        with get_session() as session:
-            db_sess = session.get(Session, sess.id)
-            if db_sess:
-                db_sess.status = JobStatus.completed if success else JobStatus.failed
-                db_sess.ended_at = datetime.utcnow()
-                db_sess.reason = reason
-                session.add(db_sess)
-                session.commit()
-
-    def _retry_within_window(self, schedule: Schedule) -> bool:
-        now = datetime.utcnow()
+    def _planned_start(self, schedule: Schedule, now: datetime) -> datetime:
+        # Runs are keyed to the tick slot they belong to, so a retry or another
+        # runner starting the same slot finds the existing session instead.
+        elapsed = (now - schedule.starts_at).total_seconds()
+        return schedule.starts_at + timedelta(seconds=elapsed - elapsed % settings.scheduler_tick_seconds)
+
+    async def _start_session(
+        self, session: AsyncSession, schedule: Schedule, job: Job, planned_start: datetime, now: datetime
+    ) -> Optional[Session]:
+        pipeline_summary = await build_pipeline_summary(session, job)
+        statement = (
+            dialect_insert(Session)
+            .values(
+                schedule_id=schedule.id,
+                job_id=job.id,
+                planned_start=planned_start,
+                # The tick's clock, so started_at never lands after ended_at.
+                started_at=now,
+                ffmpeg_log_path=pipeline_summary,
+            )
+            .on_conflict_do_nothing()
+            .returning(Session)
+        )
+        sess = (await session.exec(statement)).scalar_one_or_none()
+        if sess is None:
+            return None
+        job.status = JobStatus.running
+        job.updated_at = now
+        schedule.last_run_at = now
+        self._bump(session, streams=1, active_sessions=1)
+        self._record_event(session, schedule.id, job.id, EventType.started, f"Session started with pipeline {pipeline_summary}")
+        return sess
+
+    async def _complete_session(
+        self, session: AsyncSession, sess: Session, success: bool, now: datetime, reason: Optional[str] = None
+    ) -> None:
+        sess.status = JobStatus.completed if success else JobStatus.failed
+        sess.ended_at = now
+        sess.reason = reason
+        self._bump(session, active_sessions=-1)
+
+    def _retry_within_window(self, schedule: Schedule, now: datetime) -> bool:
         if schedule.ends_at and now > schedule.ends_at:
             return False
         planned_end = schedule.starts_at + timedelta(minutes=schedule.duration_minutes or 0)
@@ -108,60 +290,160 @@ class Scheduler:
             return False
         return True
 
-    def _handle_invalid(self, job: Job, reason: str) -> None:
+    async def _handle_invalid(self, session: AsyncSession, job: Job, reason: str, now: datetime) -> None:
+        was_invalid = job.invalid_reason is not None
         job.status = JobStatus.invalid
         job.invalid_reason = reason
-        job.updated_at = datetime.utcnow()
-        with get_session() as session:
-            session.add(job)
-            session.add(
-                EventLog(
-                    job_id=job.id,
-                    event_type=EventType.invalidated,
-                    message=reason,
-                )
-            )
-            session.commit()
+        job.updated_at = now
+        self._record_event(session, None, job.id, EventType.invalidated, reason)
+        if not was_invalid:
+            self._bump(session, invalid_jobs=1)
 
-    def _process_schedule(self, schedule: Schedule) -> None:
-        with get_session() as session:
-            job = session.get(Job, schedule.job_id)
-        if job is None:
-            return
-        tier = licensing_client.get_tier()
+    async def _process_schedule(
+        self,
+        session: AsyncSession,
+        schedule: Schedule,
+        job: Optional[Job],
+        now: datetime,
+        tier: Optional[LicenseTier] = None,
+        planned_start: Optional[datetime] = None,
+    ) -> Optional[Session]:
+        # planned_start defaults to the tick slot; explicit runs pass their own so they
+        # are not folded into a slot that already ran.
+        if job is None or not self._is_due(schedule, now):
+            return None
+        tier = tier or licensing_client.get_tier()
         if tier == LicenseTier.basic and schedule.loop and schedule.mode == ScheduleMode.windowed:
-            self._handle_invalid(job, "Looped windows require Premium or above")
-            return
+            await self._handle_invalid(session, job, "Looped windows require Premium or above", now)
+            return None
         invalid_reason = self._validate_schedule(schedule)
         if invalid_reason:
-            self._handle_invalid(job, invalid_reason)
-            return
-        if not self._should_run(schedule):
-            return
-        session_obj = self._start_session(schedule, job)
+            await self._handle_invalid(session, job, invalid_reason, now)
+            return None
+        if not self._should_run(schedule, now):
+            return None
+        planned_start = planned_start or self._planned_start(schedule, now)
+        session_obj = await self._start_session(session, schedule, job, planned_start, now)
+        if session_obj is None:
+            existing = select(Session).where(Session.schedule_id == schedule.id, Session.planned_start == planned_start)
+            return (await session.exec(existing)).one()
         simulated_success = True
-        self._complete_session(session_obj, simulated_success)
+        await self._complete_session(session, session_obj, simulated_success, now)
+        return session_obj
+
+    def _sharded(self) -> bool:
+        return settings.scheduler_skip_locked and async_engine.dialect.name == "postgresql"
+
+    async def _run_batch(self, session: AsyncSession, rows: Any, now: datetime) -> list[int]:
+        retry_ids: list[int] = []
+        tier = licensing_client.get_tier()
+        # Read everything up front: a rolled-back savepoint expires the objects it
+        # touched, including a Job shared with later rows, and reloading them outside
+        # the try would lazy-load (MissingGreenlet) and abort the whole batch.
+        plan = [(schedule, job, schedule.id, job.id, self._retry_within_window(schedule, now)) for schedule, job in rows]
+        for schedule, job, schedule_id, job_id, retry in plan:
+            pending = self._pending_events(session)
+            staged = len(pending)
+            counters = dict(self._pending_counters(session))
+            try:
+                async with session.begin_nested():
+                    if inspect(job).expired:
+                        await session.refresh(job)
+                    await self._process_schedule(session, schedule, job, now, tier)
+            except Exception as exc:
+                # Events and counters staged by the rolled-back savepoint must not be written.
+                del pending[staged:]
+                session.info["pending_counters"] = counters
+                self._record_event(session, schedule_id, job_id, EventType.retry, str(exc))
+                if retry:
+                    retry_ids.append(schedule_id)
+        await self._flush_pending(session)
+        await session.commit()
+        return retry_ids
+
+    async def _run_due(self, now: datetime) -> list[int]:
+        # Workers share one keyset cursor. Claims are serialised so no two batches
+        # overlap, while processing and commits run concurrently on pooled sessions.
+        claim_lock = asyncio.Lock()
+        after_id = 0
+        exhausted = False
+        if self._sharded():
+            statement = _SHARDED_DUE_STMT
+            params = {"now": now, "claimed_before": now - timedelta(seconds=settings.scheduler_tick_seconds)}
+        else:
+            statement, params = _DUE_STMT, {"now": now}
+
+        async def worker() -> list[int]:
+            nonlocal after_id, exhausted
+            retry_ids: list[int] = []
+            while not exhausted:
+                async with async_session_factory() as session:
+                    async with claim_lock:
+                        if exhausted:
+                            break
+                        rows = (await session.exec(statement, params={**params, "after_id": after_id})).all()
+                        exhausted = len(rows) < settings.scheduler_batch_size
+                        if rows:
+                            after_id = rows[-1][0].id
+                    retry_ids.extend(await self._run_batch(session, rows, now))
+            return retry_ids
+
+        # SQLite allows a single writer, so concurrent batches would only contend.
+        workers = 1 if IS_SQLITE else settings.scheduler_concurrency
+        results = await asyncio.gather(*(worker() for _ in range(workers)), return_exceptions=True)
+        retry_ids: list[int] = []
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+            retry_ids.extend(result)
+        return retry_ids
 
     async def _tick(self) -> None:
+        standby_delay = settings.scheduler_tick_seconds
         while True:
-            if not self._acquire_lock():
+            try:
+                await self._ensure_listener()
+                now = utcnow()
+                if not self._sharded() and not await self._acquire_lock(now):
+                    await asyncio.sleep(standby_delay)
+                    standby_delay = min(standby_delay * 2, settings.scheduler_tick_seconds * 3)
+                    continue
+                standby_delay = settings.scheduler_tick_seconds
+                retry_ids = await self._run_due(now)
+                if retry_ids:
+                    await asyncio.sleep(settings.scheduler_tick_seconds)
+                    # _run_due may have been slow; never retry on a lease another runner took over.
+                    if not self._sharded() and not await self._acquire_lock(utcnow()):
+                        continue
+                    async with async_session_factory() as session:
+                        rows = (await session.exec(_RETRY_STMT, params={"ids": retry_ids})).all()
+                        await self._run_batch(session, rows, utcnow())
+                await self._sleep(await self._next_delay(utcnow()))
+            except Exception:
+                # A failed tick (lost connection, lock timeout) must not end the loop;
+                # CancelledError is a BaseException and still stops it.
+                logger.exception("Scheduler tick failed")
                 await asyncio.sleep(settings.scheduler_tick_seconds)
-                continue
-            with get_session() as session:
-                schedules = session.exec(select(Schedule)).all()
-            for schedule in schedules:
-                try:
-                    self._process_schedule(schedule)
-                except Exception as exc:  # pragma: no cover
-                    self._record_event(schedule.id, schedule.job_id, EventType.retry, str(exc))
-                    if self._retry_within_window(schedule):
-                        await asyncio.sleep(settings.scheduler_tick_seconds)
-                        self._process_schedule(schedule)
-            await asyncio.sleep(settings.scheduler_tick_seconds)
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        if self._task is task:
+            self._task = None
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Scheduler loop stopped", exc_info=task.exception())
 
     def start(self) -> None:
         if self._task is None:
-            self._task = asyncio.create_task(self._tick())
+            self._task = asyncio.create_task(self._tick(), name="scheduler_tick")
+            self._task.add_done_callback(self._on_done)
+
+    async def stop(self) -> None:
+        task = self._task
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        await self._release_lock_conn()
+        await self._release_listen_conn()
 
 
 scheduler = Scheduler()
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from typing import Any
+from sqlalchemy import column, table, text
+from sqlmodel import Session as DBSession
+from ..models import Asset
+
+asset_fts = table("asset_fts", column("rowid"), column("name"))
+
+ASSET_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS asset_fts USING fts5(name, content='asset', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS asset_fts_ai AFTER INSERT ON asset BEGIN "
+    "INSERT INTO asset_fts(rowid, name) VALUES (new.id, new.name); END",
+    "CREATE TRIGGER IF NOT EXISTS asset_fts_ad AFTER DELETE ON asset BEGIN "
+    "INSERT INTO asset_fts(asset_fts, rowid, name) VALUES ('delete', old.id, old.name); END",
+    "CREATE TRIGGER IF NOT EXISTS asset_fts_au AFTER UPDATE OF name ON asset BEGIN "
+    "INSERT INTO asset_fts(asset_fts, rowid, name) VALUES ('delete', old.id, old.name); "
+    "INSERT INTO asset_fts(rowid, name) VALUES (new.id, new.name); END",
+)
+
+
+def fts_enabled(session: DBSession) -> bool:
+    return session.get_bind().dialect.name == "sqlite"
+
+
+def ensure_asset_fts(session: DBSession) -> None:
+    if not fts_enabled(session):
+        return
+    exists = session.exec(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'asset_fts'")).first()
+    for statement in ASSET_FTS_DDL:
+        session.exec(text(statement))
+    if exists is None:
+        session.exec(text("INSERT INTO asset_fts(asset_fts) VALUES ('rebuild')"))
+    session.commit()
+
+
+def _match_expression(query: str) -> str:
+    terms = query.split()
+    return " ".join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+
+def filter_assets(session: DBSession, statement: Any, query: str) -> Any:
+    if not fts_enabled(session):
+        return statement.where(Asset.name.contains(query))
+    match = _match_expression(query)
+    if not match:
+        return statement
+    return statement.join(asset_fts, asset_fts.c.rowid == Asset.id).where(asset_fts.c.name.match(match))
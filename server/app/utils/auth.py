@@ -1,13 +1,24 @@
 from __future__ import annotations
 
+import hmac
+from typing import Optional
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import APIKeyHeader
 from ..config import settings
 
 api_key_scheme = APIKeyHeader(name="X-API-Key", auto_error=False)
 
+_EXPECTED_KEY = settings.api_key.encode()
+
+
+def reload_api_key() -> None:
+    """Re-read the expected key after ``settings.api_key`` changes."""
+    global _EXPECTED_KEY
+    _EXPECTED_KEY = settings.api_key.encode()
+
 
-def get_api_key(api_key: str = Depends(api_key_scheme)) -> str:
-    if api_key != settings.api_key:
+def get_api_key(api_key: Optional[str] = Depends(api_key_scheme)) -> str:
+    if not api_key or not hmac.compare_digest(api_key.encode(), _EXPECTED_KEY):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid API key")
     return api_key
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+
+# Settings and engines are created at import time, so point them at a scratch
+# database before anything from the app is imported.
+_DB_DIR = tempfile.mkdtemp(prefix="zstrm-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+
+import pytest  # noqa: E402
+
+from server.app.database import async_engine, get_session, init_db  # noqa: E402
+from server.app.models import Asset, Destination, Preset  # noqa: E402
+
+init_db()
+
+
+@pytest.fixture
+def run():
+    def runner(coroutine):
+        async def wrapped():
+            try:
+                return await coroutine
+            finally:
+                # Pooled aiosqlite connections are bound to the loop that opened them.
+                await async_engine.dispose()
+
+        return asyncio.run(wrapped())
+
+    return runner
+
+
+@pytest.fixture
+def job_parts():
+    with get_session() as session:
+        asset = Asset(name="asset")
+        destination = Destination(name="destination", endpoint="rtmp://example/live")
+        preset = Preset(name="preset")
+        session.add_all([asset, destination, preset])
+        session.commit()
+        return asset.id, destination.id, preset.id
@@ -0,0 +1,116 @@
+CREATE TABLE asset (
+	id INTEGER NOT NULL,
+	name VARCHAR NOT NULL,
+	source_url VARCHAR,
+	size_bytes INTEGER,
+	duration_seconds INTEGER,
+	thumbnail_path VARCHAR,
+	audio_only BOOLEAN NOT NULL,
+	created_at DATETIME NOT NULL,
+	PRIMARY KEY (id)
+);
+
+CREATE TABLE destination (
+	id INTEGER NOT NULL,
+	name VARCHAR NOT NULL,
+	endpoint VARCHAR NOT NULL,
+	stream_key VARCHAR,
+	enabled BOOLEAN NOT NULL,
+	created_at DATETIME NOT NULL,
+	PRIMARY KEY (id)
+);
+
+CREATE TABLE licensestate (
+	id INTEGER NOT NULL,
+	tier VARCHAR(8) NOT NULL,
+	install_id VARCHAR NOT NULL,
+	install_secret VARCHAR NOT NULL,
+	lease_expires_at DATETIME NOT NULL,
+	grace_expires_at DATETIME,
+	last_checked_at DATETIME NOT NULL,
+	PRIMARY KEY (id)
+);
+
+CREATE TABLE preset (
+	id INTEGER NOT NULL,
+	name VARCHAR NOT NULL,
+	preset_type VARCHAR(6) NOT NULL,
+	video_bitrate INTEGER,
+	audio_bitrate INTEGER,
+	force_encode BOOLEAN NOT NULL,
+	audio_replace VARCHAR(13) NOT NULL,
+	hot_swap VARCHAR(9) NOT NULL,
+	created_at DATETIME NOT NULL,
+	PRIMARY KEY (id)
+);
+
+CREATE TABLE runnerlock (
+	id INTEGER NOT NULL,
+	lock_name VARCHAR NOT NULL,
+	locked_by VARCHAR NOT NULL,
+	locked_at DATETIME NOT NULL,
+	expires_at DATETIME NOT NULL,
+	PRIMARY KEY (id)
+);
+
+CREATE INDEX ix_runnerlock_lock_name ON runnerlock (lock_name);
+
+CREATE TABLE job (
+	id INTEGER NOT NULL,
+	asset_id INTEGER NOT NULL,
+	destination_id INTEGER NOT NULL,
+	preset_id INTEGER NOT NULL,
+	created_at DATETIME NOT NULL,
+	updated_at DATETIME NOT NULL,
+	status VARCHAR(9) NOT NULL,
+	invalid_reason VARCHAR,
+	requested_at DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(asset_id) REFERENCES asset (id),
+	FOREIGN KEY(destination_id) REFERENCES destination (id),
+	FOREIGN KEY(preset_id) REFERENCES preset (id)
+);
+
+CREATE TABLE schedule (
+	id INTEGER NOT NULL,
+	job_id INTEGER NOT NULL,
+	starts_at DATETIME NOT NULL,
+	ends_at DATETIME,
+	duration_minutes INTEGER,
+	mode VARCHAR(8) NOT NULL,
+	loop BOOLEAN NOT NULL,
+	run_now BOOLEAN NOT NULL,
+	created_at DATETIME NOT NULL,
+	last_run_at DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(job_id) REFERENCES job (id)
+);
+
+CREATE TABLE session (
+	id INTEGER NOT NULL,
+	schedule_id INTEGER NOT NULL,
+	job_id INTEGER NOT NULL,
+	started_at DATETIME NOT NULL,
+	ended_at DATETIME,
+	status VARCHAR(9) NOT NULL,
+	ffmpeg_log_path VARCHAR,
+	created_log_at DATETIME,
+	reason VARCHAR,
+	PRIMARY KEY (id),
+	FOREIGN KEY(schedule_id) REFERENCES schedule (id),
+	FOREIGN KEY(job_id) REFERENCES job (id)
+);
+
+CREATE TABLE eventlog (
+	id INTEGER NOT NULL,
+	session_id INTEGER,
+	job_id INTEGER,
+	schedule_id INTEGER,
+	event_type VARCHAR(11) NOT NULL,
+	message VARCHAR NOT NULL,
+	created_at DATETIME NOT NULL,
+	PRIMARY KEY (id),
+	FOREIGN KEY(session_id) REFERENCES session (id),
+	FOREIGN KEY(job_id) REFERENCES job (id),
+	FOREIGN KEY(schedule_id) REFERENCES schedule (id)
+);
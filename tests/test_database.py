@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from server.app.config import settings
+from server.app.database import async_engine, engine, warm_pool
+
+
+def test_warm_pool_fills_both_engines(run):
+    engine.dispose()
+
+    async def warm() -> int:
+        await async_engine.dispose()
+        await warm_pool()
+        return async_engine.pool.checkedin()
+
+    assert run(warm()) == settings.pool_size
+    assert engine.pool.checkedin() == settings.pool_size
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import asyncio
+import subprocess
+import sys
+
+import httpx
+import pytest
+
+from server.app.config import settings
+from server.app.services import licensing
+from server.app.services.licensing import LicenseRenewalError, LicensingClient
+
+
+def failing_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(503)))
+
+
+def test_failed_renewal_persists_grace_and_raises(run):
+    client = LicensingClient()
+    client._http = failing_client()
+    with pytest.raises(LicenseRenewalError) as excinfo:
+        run(client.renew_license(client.state))
+    assert excinfo.value.state.grace_expires_at is not None
+
+
+def test_failing_endpoint_backs_off_exponentially(run, monkeypatch):
+    monkeypatch.setattr(settings, "licensing_retry_backoff_minutes", 1)
+    monkeypatch.setattr(settings, "licensing_retry_max_backoff_seconds", 600)
+    monkeypatch.setattr(licensing.random, "uniform", lambda low, high: 0.0)
+    delays: list[float] = []
+
+    async def fake_sleep(delay: float) -> None:
+        delays.append(delay)
+        if len(delays) == 5:
+            raise asyncio.CancelledError
+
+    monkeypatch.setattr(licensing.asyncio, "sleep", fake_sleep)
+    client = LicensingClient()
+    client._http = failing_client()
+    with pytest.raises(asyncio.CancelledError):
+        run(client._run())
+    assert delays == [60, 120, 240, 480, 600]
+
+
+def test_importing_the_app_does_not_set_up_the_schema():
+    script = (
+        "import server.app.database as database\n"
+        "calls = []\n"
+        "database.init_db = lambda: calls.append(1)\n"
+        "import server.app.main\n"
+        "print(len(calls))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "0"
+
+
+def test_state_is_loaded_on_first_use(monkeypatch):
+    loads: list[int] = []
+
+    def load_license():
+        loads.append(1)
+        return original()
+
+    original = licensing._load_license
+    monkeypatch.setattr(licensing, "_load_license", load_license)
+    client = LicensingClient()
+    assert loads == []
+    assert client.state.id is not None
+    client.get_tier()
+    assert loads == [1]
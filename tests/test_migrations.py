@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine
+from sqlmodel import SQLModel
+
+from server.app.config import settings
+
+ROOT = Path(__file__).resolve().parents[1]
+LEGACY_SCHEMA = Path(__file__).with_name("fixtures") / "legacy_schema.sql"
+
+
+@pytest.fixture
+def legacy_db(tmp_path, monkeypatch):
+    path = tmp_path / "legacy.db"
+    with sqlite3.connect(path) as connection:
+        connection.executescript(LEGACY_SCHEMA.read_text())
+    monkeypatch.setattr(settings, "database_url", f"sqlite:///{path}")
+    return path
+
+
+def upgrade(revision: str = "head") -> None:
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "alembic"))
+    command.upgrade(config, revision)
+
+
+def test_min_tier_is_added_and_backfilled(legacy_db):
+    with sqlite3.connect(legacy_db) as connection:
+        connection.executemany(
+            "INSERT INTO preset (name, preset_type, force_encode, audio_replace, hot_swap, created_at) "
+            "VALUES (?, 'copy', 0, ?, ?, '2024-01-01 00:00:00')",
+            [
+                ("plain", "none", "none"),
+                ("loop", "external_loop", "none"),
+                ("next", "none", "next_loop"),
+                ("swap", "video_only", "immediate"),
+            ],
+        )
+    upgrade()
+    with sqlite3.connect(legacy_db) as connection:
+        tiers = dict(connection.execute("SELECT name, min_tier FROM preset"))
+    assert tiers == {"plain": "basic", "loop": "premium", "next": "premium", "swap": "ultimate"}
+
+
+def test_timestamp_columns_get_utc_server_defaults(legacy_db):
+    upgrade()
+    with sqlite3.connect(legacy_db) as connection:
+        connection.execute("INSERT INTO asset (name, audio_only) VALUES ('defaulted', 0)")
+        (created_at,) = connection.execute("SELECT created_at FROM asset WHERE name = 'defaulted'").fetchone()
+    assert "." in created_at
+
+
+def _schema_diff(path: Path) -> list:
+    engine = create_engine(f"sqlite:///{path}")
+    try:
+        with engine.connect() as connection:
+            return compare_metadata(MigrationContext.configure(connection), SQLModel.metadata)
+    finally:
+        engine.dispose()
+
+
+def test_legacy_database_upgrades_to_current_schema(legacy_db):
+    with sqlite3.connect(legacy_db) as connection:
+        connection.executescript(
+            """
+            INSERT INTO asset (id, name, audio_only, created_at) VALUES (1, 'a', 0, '2024-01-01 00:00:00');
+            INSERT INTO destination (id, name, endpoint, enabled, created_at)
+                VALUES (1, 'd', 'rtmp://x', 1, '2024-01-01 00:00:00');
+            INSERT INTO preset (id, name, preset_type, force_encode, audio_replace, hot_swap, created_at)
+                VALUES (1, 'p', 'copy', 0, 'none', 'none', '2024-01-01 00:00:00');
+            INSERT INTO job (id, asset_id, destination_id, preset_id, created_at, updated_at, status)
+                VALUES (1, 1, 1, 1, '2024-01-01 00:00:00', '2024-01-01 00:00:00', 'pending');
+            INSERT INTO schedule (id, job_id, starts_at, duration_minutes, mode, loop, run_now, created_at)
+                VALUES (1, 1, '2024-01-01 10:00:00.000000', 90, 'windowed', 0, 0, '2024-01-01 00:00:00');
+            INSERT INTO runnerlock (lock_name, locked_by, locked_at, expires_at) VALUES
+                ('scheduler', 'old', '2024-01-01 00:00:00', '2024-01-01 00:03:00'),
+                ('scheduler', 'new', '2024-01-01 00:05:00', '2024-01-01 00:08:00');
+            """
+        )
+    upgrade()
+    assert _schema_diff(legacy_db) == []
+    with sqlite3.connect(legacy_db) as connection:
+        (planned_end,) = connection.execute("SELECT planned_end_at FROM schedule WHERE id = 1").fetchone()
+        locks = connection.execute("SELECT locked_by FROM runnerlock").fetchall()
+    assert planned_end.startswith("2024-01-01 11:30:00")
+    assert locks == [("new",)]
+
+
+def test_upgrade_is_a_no_op_on_a_current_schema(tmp_path, monkeypatch):
+    path = tmp_path / "current.db"
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    engine.dispose()
+    monkeypatch.setattr(settings, "database_url", f"sqlite:///{path}")
+    upgrade()
+    assert _schema_diff(path) == []
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from server.app.database import async_session_factory, get_session
+from server.app.models import Job, Preset, PresetType
+from server.app.services.pipeline import build_pipeline_summary
+
+
+def summarize(job_id: int):
+    async def load() -> str:
+        async with async_session_factory() as session:
+            return await build_pipeline_summary(session, await session.get(Job, job_id))
+
+    return load()
+
+
+def test_summary_follows_edited_preset(job_parts, run):
+    asset_id, destination_id, preset_id = job_parts
+    with get_session() as session:
+        job = Job(asset_id=asset_id, destination_id=destination_id, preset_id=preset_id)
+        session.add(job)
+        session.commit()
+        job_id = job.id
+
+    assert run(summarize(job_id)) == "ffmpeg -re -c copy // preset=preset // audio -> rtmp://example/live"
+
+    with get_session() as session:
+        preset = session.get(Preset, preset_id)
+        preset.preset_type = PresetType.encode
+        preset.video_bitrate = 2500
+        session.add(preset)
+        session.commit()
+
+    assert run(summarize(job_id)) == "ffmpeg -re // preset=encode-v2500-aauto // audio -> rtmp://example/live"
+
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from server.app.database import get_session
+from server.app.models import AudioReplaceMode, HotSwapMode, Job, JobStatus, LicenseTier, Preset
+from server.app.services.jobs import evaluate_license
+
+
+def test_preset_built_directly_derives_min_tier():
+    with get_session() as session:
+        preset = Preset(name="direct", audio_replace=AudioReplaceMode.external_loop)
+        session.add(preset)
+        session.commit()
+        assert preset.min_tier == LicenseTier.premium
+
+        preset.hot_swap = HotSwapMode.immediate
+        session.add(preset)
+        session.commit()
+        assert preset.min_tier == LicenseTier.ultimate
+
+
+def test_stored_tier_cannot_be_weakened():
+    with get_session() as session:
+        preset = Preset(name="forged", hot_swap=HotSwapMode.next_loop, min_tier=LicenseTier.basic)
+        session.add(preset)
+        session.commit()
+        assert preset.min_tier == LicenseTier.premium
+
+
+def test_direct_preset_still_gates_jobs(job_parts):
+    asset_id, destination_id, _ = job_parts
+    with get_session() as session:
+        preset = Preset(name="gated", audio_replace=AudioReplaceMode.video_only)
+        session.add(preset)
+        session.commit()
+        job = Job(asset_id=asset_id, destination_id=destination_id, preset_id=preset.id)
+        session.add(job)
+        session.flush()
+        evaluate_license(job, preset=preset, session=session)
+        assert job.status == JobStatus.invalid
+        assert job.invalid_reason == "Audio replace requires Premium"
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from server.app.api.routes import router
+from server.app.config import settings
+from server.app.database import get_session
+from server.app.models import Job, Schedule
+from server.app.services.scheduler import utcnow
+
+
+def test_list_pages_are_serialized_by_response_model(job_parts):
+    app = FastAPI()
+    app.include_router(router)
+    with TestClient(app) as client:
+        response = client.get("/presets", params={"limit": 1000}, headers={"X-API-Key": settings.api_key})
+    assert response.status_code == 200
+    preset = next(item for item in response.json() if item["id"] == job_parts[2])
+    assert preset["preset_type"] == "copy"
+    assert preset["audio_replace"] == "none"
+    assert isinstance(preset["created_at"], str)
+
+
+def test_unknown_references_return_404(job_parts):
+    asset_id, destination_id, _ = job_parts
+    app = FastAPI()
+    app.include_router(router)
+    headers = {"X-API-Key": settings.api_key}
+    with TestClient(app) as client:
+        job = client.post(
+            "/jobs",
+            json={"asset_id": asset_id, "destination_id": destination_id, "preset_id": 999_999},
+            headers=headers,
+        )
+        schedule = client.post(
+            "/schedules", json={"job_id": 999_999, "starts_at": "2026-01-01T00:00:00"}, headers=headers
+        )
+    assert (job.status_code, job.json()["detail"]) == (404, "Preset not found")
+    assert (schedule.status_code, schedule.json()["detail"]) == (404, "Job not found")
+
+
+def test_run_now_starts_a_new_session_each_call(job_parts):
+    asset_id, destination_id, preset_id = job_parts
+    with get_session() as session:
+        job = Job(asset_id=asset_id, destination_id=destination_id, preset_id=preset_id)
+        session.add(job)
+        session.flush()
+        schedule = Schedule(job_id=job.id, starts_at=utcnow() - timedelta(minutes=1), duration_minutes=60)
+        session.add(schedule)
+        session.commit()
+        payload = {"job_id": job.id, "schedule_id": schedule.id}
+    app = FastAPI()
+    app.include_router(router)
+    with TestClient(app) as client:
+        first = client.post("/run-now", json=payload, headers={"X-API-Key": settings.api_key})
+        second = client.post("/run-now", json=payload, headers={"X-API-Key": settings.api_key})
+    assert first.status_code == second.status_code == 200
+    assert first.json()["id"] != second.json()["id"]
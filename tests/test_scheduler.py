@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import select
+
+from server.app.config import settings
+from server.app.database import async_engine, async_session_factory, get_session
+from server.app.models import DASHBOARD_COUNTERS_ID, DashboardCounters, EventLog, EventType, Job, Schedule, Session
+from server.app.services.scheduler import (
+    _RETRY_STMT,
+    LEASE_RENEW_TICKS,
+    LEASE_TICKS,
+    Scheduler,
+    scheduler,
+    utcnow,
+)
+
+
+def due_schedules(job_parts, count: int) -> list[int]:
+    asset_id, destination_id, preset_id = job_parts
+    with get_session() as session:
+        jobs = [Job(asset_id=asset_id, destination_id=destination_id, preset_id=preset_id) for _ in range(count)]
+        session.add_all(jobs)
+        session.flush()
+        schedules = [
+            Schedule(job_id=job.id, starts_at=utcnow() - timedelta(minutes=1), duration_minutes=60) for job in jobs
+        ]
+        session.add_all(schedules)
+        session.commit()
+        return [schedule.id for schedule in schedules]
+
+
+def counters() -> DashboardCounters:
+    with get_session() as session:
+        return session.get(DashboardCounters, DASHBOARD_COUNTERS_ID)
+
+
+def run_batch(schedule_ids: list[int]):
+    async def batch() -> list[int]:
+        async with async_session_factory() as session:
+            rows = (await session.exec(_RETRY_STMT, params={"ids": schedule_ids})).all()
+            return await scheduler._run_batch(session, rows, utcnow())
+
+    return batch()
+
+
+def test_batch_bumps_counters_once_before_commit(job_parts, run):
+    schedule_ids = due_schedules(job_parts, 5)
+    before = counters()
+    updates: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany) -> None:
+        if statement.startswith("UPDATE dashboardcounters"):
+            updates.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        assert run(run_batch(schedule_ids)) == []
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+    after = counters()
+    assert len(updates) == 1
+    assert after.streams == before.streams + 5
+    assert after.active_sessions == before.active_sessions
+
+
+def test_tick_survives_failures_until_cancelled(run, monkeypatch):
+    from server.app.services import scheduler as scheduler_module
+
+    attempts: list[int] = []
+    sleeps: list[float] = []
+
+    async def failing_run_due(self, now) -> list[int]:
+        attempts.append(1)
+        raise RuntimeError("database went away")
+
+    async def fake_sleep(delay: float) -> None:
+        sleeps.append(delay)
+        if len(sleeps) == 3:
+            raise asyncio.CancelledError
+
+    monkeypatch.setattr(Scheduler, "_run_due", failing_run_due)
+    monkeypatch.setattr(scheduler_module.asyncio, "sleep", fake_sleep)
+    with pytest.raises(asyncio.CancelledError):
+        run(scheduler._tick())
+    assert len(attempts) == 3
+    assert sleeps == [settings.scheduler_tick_seconds] * 3
+
+
+def test_failed_schedule_is_retried_without_blocking_the_batch(job_parts, run, monkeypatch):
+    schedule_ids = due_schedules(job_parts, 3)
+    failing_id = schedule_ids[1]
+    process_schedule = Scheduler._process_schedule
+
+    async def flaky_process_schedule(self, session, schedule, job, now, tier=None):
+        result = await process_schedule(self, session, schedule, job, now, tier)
+        if schedule.id == failing_id:
+            raise RuntimeError("encoder unavailable")
+        return result
+
+    monkeypatch.setattr(Scheduler, "_process_schedule", flaky_process_schedule)
+    before = counters()
+    assert run(run_batch(schedule_ids)) == [failing_id]
+
+    with get_session() as session:
+        started = session.exec(
+            select(Session.schedule_id).where(Session.schedule_id.in_(schedule_ids))
+        ).all()
+        retries = session.exec(
+            select(EventLog).where(EventLog.schedule_id == failing_id, EventLog.event_type == EventType.retry)
+        ).all()
+    assert sorted(started) == [schedule_ids[0], schedule_ids[2]]
+    assert [event.message for event in retries] == ["encoder unavailable"]
+    assert counters().streams == before.streams + 2
+
+
+def test_failure_does_not_break_other_schedules_of_the_same_job(job_parts, run, monkeypatch):
+    asset_id, destination_id, preset_id = job_parts
+    with get_session() as session:
+        job = Job(asset_id=asset_id, destination_id=destination_id, preset_id=preset_id)
+        session.add(job)
+        session.flush()
+        schedules = [
+            Schedule(job_id=job.id, starts_at=utcnow() - timedelta(minutes=1), duration_minutes=60) for _ in range(2)
+        ]
+        session.add_all(schedules)
+        session.commit()
+        schedule_ids = [schedule.id for schedule in schedules]
+    failing_id = schedule_ids[0]
+    process_schedule = Scheduler._process_schedule
+
+    async def flaky_process_schedule(self, session, schedule, job, now, tier=None):
+        result = await process_schedule(self, session, schedule, job, now, tier)
+        if schedule.id == failing_id:
+            raise RuntimeError("encoder unavailable")
+        return result
+
+    monkeypatch.setattr(Scheduler, "_process_schedule", flaky_process_schedule)
+    assert run(run_batch(schedule_ids)) == [failing_id]
+
+    with get_session() as session:
+        started = session.exec(select(Session.schedule_id).where(Session.schedule_id.in_(schedule_ids))).all()
+        retries = session.exec(
+            select(EventLog).where(EventLog.schedule_id == failing_id, EventLog.event_type == EventType.retry)
+        ).all()
+    assert started == [schedule_ids[1]]
+    assert len(retries) == 1
+
+
+def test_sessions_start_and_end_on_the_tick_clock(job_parts, run):
+    schedule_ids = due_schedules(job_parts, 1)
+    run(run_batch(schedule_ids))
+    with get_session() as session:
+        sess = session.exec(select(Session).where(Session.schedule_id == schedule_ids[0])).one()
+    assert sess.started_at == sess.ended_at
+
+
+def test_lease_is_renewed_with_two_ticks_of_headroom(run):
+    tick = timedelta(seconds=settings.scheduler_tick_seconds)
+    runner = Scheduler()
+
+    async def acquire(lease_left: timedelta):
+        now = utcnow()
+        runner._lease_until = now + lease_left
+        assert await runner._acquire_lock(now)
+        return runner._lease_until - now
+
+    cached = tick * LEASE_RENEW_TICKS + timedelta(seconds=1)
+    assert run(acquire(cached)) == cached
+    assert run(acquire(tick * LEASE_RENEW_TICKS)) == tick * LEASE_TICKS
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from sqlalchemy import func
+from sqlmodel import select
+
+from server.app.api.routes import create_job
+from server.app.database import get_session
+from server.app.models import Job, Schedule
+from server.app.schemas import JobCreate
+from server.app.services.scheduler import scheduler, utcnow
+
+THREADS = 8
+JOBS_PER_THREAD = 30
+
+
+def test_concurrent_create_job_does_not_lock(job_parts):
+    asset_id, destination_id, preset_id = job_parts
+    payload = JobCreate(asset_id=asset_id, destination_id=destination_id, preset_id=preset_id)
+
+    def create_many(_: int) -> int:
+        for _ in range(JOBS_PER_THREAD):
+            create_job(payload)
+        return JOBS_PER_THREAD
+
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        created = sum(pool.map(create_many, range(THREADS)))
+
+    assert created == THREADS * JOBS_PER_THREAD
+    with get_session() as session:
+        count = session.exec(select(func.count()).select_from(Job).where(Job.preset_id == preset_id)).one()
+    assert count == THREADS * JOBS_PER_THREAD
+
+
+def test_scheduler_batches_run_alongside_api_writers(job_parts, run):
+    asset_id, destination_id, preset_id = job_parts
+    payload = JobCreate(asset_id=asset_id, destination_id=destination_id, preset_id=preset_id)
+    with get_session() as session:
+        jobs = [Job(asset_id=asset_id, destination_id=destination_id, preset_id=preset_id) for _ in range(20)]
+        session.add_all(jobs)
+        session.flush()
+        session.add_all(Schedule(job_id=job.id, starts_at=utcnow() - timedelta(minutes=1)) for job in jobs)
+        session.commit()
+
+    async def ticks() -> None:
+        for _ in range(10):
+            assert await scheduler._run_due(utcnow()) == []
+
+    def create_many(_: int) -> None:
+        for _ in range(JOBS_PER_THREAD):
+            create_job(payload)
+
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        writers = [pool.submit(create_many, index) for index in range(THREADS - 1)]
+        run(ticks())
+        for writer in writers:
+            writer.result()
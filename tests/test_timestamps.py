@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+from server.app.database import get_session
+from server.app.models import Asset
+
+
+def test_server_timestamps_are_utc_with_subsecond_precision():
+    before = datetime.now(timezone.utc).replace(tzinfo=None)
+    with get_session() as session:
+        assets = [Asset(name=f"stamped-{index}") for index in range(5)]
+        session.add_all(assets)
+        session.commit()
+        stamps = [asset.created_at for asset in assets]
+    after = datetime.now(timezone.utc).replace(tzinfo=None)
+    for stamp in stamps:
+        assert before - timedelta(seconds=1) <= stamp <= after + timedelta(seconds=1)
+    assert any(stamp.microsecond for stamp in stamps)